@@ -9,8 +9,12 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+from django.conf import settings
+from servestatic import ServeStaticASGI
+
+from api.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'akvelonTestTask.settings')
 
-application = get_asgi_application()
+# Static files are served by ServeStatic before Django, so the middleware chain stays async
+application = ServeStaticASGI(get_asgi_application(), root=settings.STATIC_ROOT, prefix=settings.STATIC_URL)
@@ -46,9 +46,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -93,6 +93,38 @@ DATABASES = {
     }
 }
 
+# Local SQLite database for the development and load testing without PostgreSQL (e.g. with manage.py seed)
+if os.environ.get('DB_ENGINE') == 'sqlite':
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('DB_NAME') or BASE_DIR / 'db.sqlite3',
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# The users cache can be switched to the file based or Redis compatible backend (e.g. django_redis.cache.RedisCache)
+# by the USER_CACHE_BACKEND and USER_CACHE_LOCATION environment variables
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'users': {
+        'BACKEND': os.environ.get('USER_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('USER_CACHE_LOCATION', 'users'),
+        'TIMEOUT': int(os.environ.get('USER_CACHE_TIMEOUT', 300)),
+    },
+}
+
+USER_CACHE_ALIAS = 'users'
+# The invalidation of the process local cache does not reach the other worker processes, so the users caches
+# are disabled with LocMemCache unless it is allowed for the single process runs
+USER_CACHE_ALLOW_PROCESS_LOCAL = os.environ.get('USER_CACHE_ALLOW_PROCESS_LOCAL', 'false').lower() == 'true'
+
+# Number of seconds the authenticated user is kept in the users cache (see api/authentication.py)
+AUTH_USER_CACHE_TIMEOUT = int(os.environ.get('AUTH_USER_CACHE_TIMEOUT', 60))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -132,7 +164,7 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedStaticFilesStorage'
+STATICFILES_STORAGE = 'servestatic.storage.CompressedStaticFilesStorage'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
@@ -141,13 +173,23 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'api.AkvelonUser'
 
+AUTHENTICATION_BACKENDS = [
+    'api.backends.PooledPasswordBackend',
+]
+
+# Pool of the processes for the password hashing and verification (see api/hashing.py), 0 workers hash inline.
+# Requests are rejected with 503 when PASSWORD_HASHING_QUEUE_DEPTH tasks are already submitted and not finished
+PASSWORD_HASHING_WORKERS = int(os.environ.get('PASSWORD_HASHING_WORKERS', 2))
+PASSWORD_HASHING_QUEUE_DEPTH = int(os.environ.get('PASSWORD_HASHING_QUEUE_DEPTH', 8 * PASSWORD_HASHING_WORKERS))
+PASSWORD_HASHING_TIMEOUT = int(os.environ.get('PASSWORD_HASHING_TIMEOUT', 10))
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
         'rest_framework.permissions.IsAdminUser',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -180,3 +222,56 @@ SWAGGER_SETTINGS = {
 }
 
 CORS_ALLOW_ALL_ORIGINS = True
+
+# Number of rows validated and inserted at once by the bulk transactions endpoint
+TRANSACTIONS_BULK_CHUNK_SIZE = int(os.environ.get('TRANSACTIONS_BULK_CHUNK_SIZE', 1000))
+TRANSACTIONS_BULK_MAX_CHUNK_SIZE = 10000
+
+# Number of users inserted at once and number of processes hashing the passwords by the import_users command
+USERS_IMPORT_CHUNK_SIZE = int(os.environ.get('USERS_IMPORT_CHUNK_SIZE', 1000))
+USERS_IMPORT_MAX_CHUNK_SIZE = 10000
+USERS_IMPORT_HASHING_WORKERS = int(os.environ.get('USERS_IMPORT_HASHING_WORKERS', os.cpu_count() or 1))
+# The users import endpoint hashes the passwords in the shared hashing pool by the batches, so it accepts
+# at most USERS_IMPORT_MAX_ROWS users, the larger imports are done by the import_users command
+USERS_IMPORT_MAX_ROWS = int(os.environ.get('USERS_IMPORT_MAX_ROWS', 100))
+USERS_IMPORT_HASHING_BATCH_SIZE = int(os.environ.get('USERS_IMPORT_HASHING_BATCH_SIZE', 10))
+
+# Serving profile: wsgi (gunicorn sync workers) or asgi (uvicorn workers), see gunicorn.conf.py. The read-only
+# views are async in the asgi profile and run the blocking DRF code in the pool of ASYNC_VIEWS_THREADS threads,
+# every thread can hold its own database connection
+SERVER_PROFILE = os.environ.get('SERVER_PROFILE', 'wsgi')
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS', str(SERVER_PROFILE == 'asgi')).lower() == 'true'
+ASYNC_VIEWS_THREADS = int(os.environ.get('ASYNC_VIEWS_THREADS', 16))
+
+# Build the JSON text of the user transactions responses in PostgreSQL instead of the serializers (see api/json_agg.py)
+TRANSACTIONS_JSON_AGG = os.environ.get('TRANSACTIONS_JSON_AGG', 'true').lower() == 'true'
+# Number of transactions fetched from the server-side cursor at once by the streamed user transactions responses
+TRANSACTIONS_JSON_AGG_CHUNK_SIZE = int(os.environ.get('TRANSACTIONS_JSON_AGG_CHUNK_SIZE', 2000))
+
+# Serialize the GET responses from .values() rows with the compiled serializers (see api/compiled.py)
+COMPILED_SERIALIZERS = os.environ.get('COMPILED_SERIALIZERS', 'true').lower() == 'true'
+
+# Number of rows fetched from the server-side cursor at once by the transactions export
+TRANSACTIONS_EXPORT_CHUNK_SIZE = int(os.environ.get('TRANSACTIONS_EXPORT_CHUNK_SIZE', 2000))
+
+# Per-request metrics (see api/metrics.py): REQUEST_METRICS_SAMPLE_RATE of the requests get the SQL and serializer
+# timings and the Server-Timing header, requests slower than REQUEST_METRICS_SLOW_THRESHOLD seconds are logged
+REQUEST_METRICS = os.environ.get('REQUEST_METRICS', 'true').lower() == 'true'
+REQUEST_METRICS_SAMPLE_RATE = float(os.environ.get('REQUEST_METRICS_SAMPLE_RATE', 0.05))
+REQUEST_METRICS_SLOW_THRESHOLD = float(os.environ.get('REQUEST_METRICS_SLOW_THRESHOLD', 1.0))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api': {
+            'handlers': ['console'],
+            'level': os.environ.get('API_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
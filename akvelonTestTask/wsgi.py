@@ -9,8 +9,11 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
+from servestatic import ServeStatic
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'akvelonTestTask.settings')
 
-application = get_wsgi_application()
+# Static files are served by ServeStatic before Django, like in the ASGI profile (see asgi.py)
+application = ServeStatic(get_wsgi_application(), root=settings.STATIC_ROOT, prefix=settings.STATIC_URL)
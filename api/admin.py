@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 
+from .amounts import from_minor_units
 from .models import AkvelonUser, Transaction
 
 
@@ -24,7 +25,7 @@ class TransactionAdmin(admin.ModelAdmin):
     list_display = [
         'user_link',
         'date',
-        'amount'
+        'amount_value'
     ]
 
     """
@@ -41,3 +42,10 @@ class TransactionAdmin(admin.ModelAdmin):
         if display_text:
             return mark_safe(display_text)
         return "-"
+
+    """
+        Method for displaying the decimal amount instead of the stored minor units
+    """
+    @admin.display(description='amount', ordering='amount')
+    def amount_value(self, obj):
+        return from_minor_units(obj.amount)
@@ -0,0 +1,19 @@
+from decimal import Decimal
+
+"""
+    Amounts of the transactions are stored as the integer number of the minor units (cents),
+    so the sums are exact and calculated by the database as integer sums. The API accepts and
+    returns decimal amounts with the AMOUNT_DECIMAL_PLACES digits after the point
+"""
+
+AMOUNT_DECIMAL_PLACES = 2
+# Number of digits of the largest BigIntegerField value
+AMOUNT_MAX_DIGITS = 18
+
+
+def to_minor_units(amount):
+    return int(Decimal(amount).scaleb(AMOUNT_DECIMAL_PLACES).to_integral_value())
+
+
+def from_minor_units(value):
+    return Decimal(value).scaleb(-AMOUNT_DECIMAL_PLACES)
@@ -0,0 +1,53 @@
+import django
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+
+"""
+    ASGI handler of the ASGI profile (see akvelonTestTask/asgi.py). Django 3.2 iterates the streaming
+    responses in the event loop, so the export (see api/export.py), which reads the server-side cursor
+    while it is iterated, fails with SynchronousOnlyOperation there. The handler fetches the parts of
+    the streaming responses in the sync thread instead, up to chunk_size bytes by one switch
+"""
+class StreamingASGIHandler(ASGIHandler):
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super(StreamingASGIHandler, self).send_response(response, send)
+
+        response_headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode('ascii')
+            if isinstance(value, str):
+                value = value.encode('latin1')
+            response_headers.append((bytes(header), bytes(value)))
+        for c in response.cookies.values():
+            response_headers.append((b'Set-Cookie', c.output(header='').encode('ascii').strip()))
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': response_headers,
+        })
+
+        # The sync thread of the view is the one of the database connection the streaming content reads from
+        parts = iter(response)
+        fetch = sync_to_async(self.fetch_parts, thread_sensitive=True)
+        while True:
+            body = await fetch(parts)
+            if not body:
+                break
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+        await send({'type': 'http.response.body'})
+        await sync_to_async(response.close, thread_sensitive=True)()
+
+    def fetch_parts(self, parts):
+        body = bytearray()
+        for part in parts:
+            body += part
+            if len(body) >= self.chunk_size:
+                break
+        return bytes(body)
+
+
+def get_asgi_application():
+    django.setup(set_prefix=False)
+    return StreamingASGIHandler()
@@ -0,0 +1,76 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, update_wrapper
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .metrics import get_request_metrics
+
+"""
+    Async versions of the read-only DRF views for the ASGI profile (see gunicorn.conf.py). Django 3.2 runs
+    the sync views under ASGI in the one shared thread, so the DRF view, which is blocking because of
+    the ORM, is run and rendered in the sized thread pool instead, and the event loop keeps accepting
+    requests while the database is queried
+"""
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=settings.ASYNC_VIEWS_THREADS,
+                                               thread_name_prefix='async-views')
+    return _executor
+
+
+"""
+    Function for running the view in the pool thread. The database connection of the thread is handled
+    like in the request_started / request_finished signals, so CONN_MAX_AGE is respected, and the queries
+    of the sampled request are instrumented on it (see api/metrics.py)
+"""
+def _run_view(view, request, *args, **kwargs):
+    close_old_connections()
+    try:
+        metrics = get_request_metrics(request)
+        if metrics is None:
+            return _render(view(request, *args, **kwargs))
+        with metrics.instrument():
+            return _render(view(request, *args, **kwargs))
+    finally:
+        close_old_connections()
+
+
+def _render(response):
+    if hasattr(response, 'render') and callable(response.render):
+        response.render()
+    return response
+
+
+"""
+    Function for building the async view of the DRF view class. The attributes of the sync view are kept,
+    so the schema generator and the csrf check see the same view
+"""
+def as_async_view(view_class, **initkwargs):
+    view = view_class.as_view(**initkwargs)
+
+    async def async_view(request, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_executor(), partial(_run_view, view, request, *args, **kwargs))
+
+    update_wrapper(async_view, view)
+    return async_view
+
+
+"""
+    Function for building the view of the read-only view class, which is async in the ASGI profile
+"""
+def read_view(view_class, **initkwargs):
+    if settings.ASYNC_READ_VIEWS:
+        return as_async_view(view_class, **initkwargs)
+    return view_class.as_view(**initkwargs)
@@ -0,0 +1,26 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import get_auth_user
+
+"""
+    JWT authentication which keeps the fields of the authenticated user in the cache for AUTH_USER_CACHE_TIMEOUT
+    seconds instead of loading it from the database on every request, the password hash is not cached
+    (see api/cache.py). The cached user is invalidated on every save (including deactivation) or delete
+    of the user (see api/signals.py)
+"""
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        user = get_auth_user(user_id, lambda: super(CachedJWTAuthentication, self).get_user(validated_token))
+
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        return user
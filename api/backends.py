@@ -0,0 +1,58 @@
+import logging
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import identify_hasher
+
+from rest_framework.request import Request
+
+from .exceptions import PasswordHashingUnavailable
+from .hashing import hash_password, verify_password
+
+logger = logging.getLogger(__name__)
+
+UserModel = get_user_model()
+
+"""
+    Authentication backend which verifies the password in the hashing pool (see api/hashing.py), it is used
+    by the token issuance and the admin login. Otherwise it works as ModelBackend. The overloaded pool is
+    reported by the 503 response only on the DRF requests, the other callers (e.g. the admin login) get
+    the failed authentication, as Django handles the exceptions of the backends as the server errors
+"""
+class PooledPasswordBackend(ModelBackend):
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        try:
+            return self.authenticate_pooled(request, username, password, **kwargs)
+        except PasswordHashingUnavailable:
+            if isinstance(request, Request):
+                raise
+            logger.warning('Password hashing is unavailable, authentication is refused')
+            return None
+
+    def authenticate_pooled(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash the password anyway, so the response time does not tell whether the user exists
+            hash_password(password)
+            return None
+        if verify_password(password, user.password) and self.user_can_authenticate(user):
+            self.update_password_hash(user, password)
+            return user
+        return None
+
+    """
+        Method for rehashing the password with the current hasher or iterations, as check_password() does
+    """
+    def update_password_hash(self, user, password):
+        try:
+            must_update = identify_hasher(user.password).must_update(user.password)
+        except ValueError:
+            must_update = False
+        if must_update:
+            user.password = hash_password(password)
+            user.save(update_fields=['password'])
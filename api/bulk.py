@@ -0,0 +1,167 @@
+from itertools import islice
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .models import AkvelonUser, Transaction, TransactionDailySummary, apply_transaction_deltas
+from .hashing import hash_passwords, hash_passwords_pooled
+from .serializers import TransactionBulkRowSerializer, UserImportRowSerializer
+
+"""
+    Bulk ingestion of the transactions. All users of the payload are resolved by one query,
+    rows are validated and inserted by chunks and invalid rows are reported without aborting
+    the rest of the payload
+"""
+
+
+def ingest_transactions(rows, chunk_size):
+    users = resolve_users(row.get('user') for row in rows if isinstance(row, dict))
+    created = 0
+    errors = []
+    rows = iter(enumerate(rows))
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        transactions = []
+        for index, row in chunk:
+            serializer = TransactionBulkRowSerializer(data=row, context={'users': users})
+            if serializer.is_valid():
+                transactions.append(Transaction(**serializer.validated_data))
+            else:
+                errors.append({'row': index, 'errors': serializer.errors})
+        created += insert_transactions(transactions, chunk_size)
+    return created, errors
+
+
+"""
+    Method for resolving the users by the ids and emails with one query, returns the dictionary
+    {id or email from the payload: user id}
+"""
+def resolve_users(references):
+    ids = {}
+    emails = set()
+    for reference in references:
+        id = parse_user_id(reference)
+        if id is not None:
+            ids.setdefault(id, set()).add(reference)
+        elif isinstance(reference, str):
+            emails.add(reference)
+    resolved = {}
+    if not ids and not emails:
+        return resolved
+    for id, email in AkvelonUser.objects.filter(Q(id__in=ids) | Q(email__in=emails)).values_list('id', 'email'):
+        for reference in ids.get(id, ()):
+            resolved[reference] = id
+        if email in emails:
+            resolved[email] = id
+    return resolved
+
+
+"""
+    Method for getting the user id from the reference of the payload: only the integers (not booleans) and
+    the strings of digits are ids, so 1.5 or true are never resolved to the user 1
+"""
+def parse_user_id(reference):
+    if isinstance(reference, bool):
+        return None
+    if isinstance(reference, int):
+        return reference
+    if isinstance(reference, str) and reference.isascii() and reference.isdigit():
+        return int(reference)
+    return None
+
+
+"""
+    Method for inserting the transactions with their daily summaries and balances in one database transaction
+"""
+def insert_transactions(transactions, chunk_size):
+    if not transactions:
+        return 0
+    with transaction.atomic():
+        Transaction.objects.bulk_create(transactions, batch_size=chunk_size)
+        apply_transaction_deltas(TransactionDailySummary.objects.collect_deltas(transactions))
+    return len(transactions)
+
+
+"""
+    Import of the users. Rows are validated first, the emails are checked against the database by one
+    query, the passwords of the accepted rows are hashed by the separate pool of hashing_workers processes
+    (by the shared pool of the request workers if it is None, see api/hashing.py) and the users are inserted
+    by chunks. Rejected rows are reported with their index in the payload
+"""
+def import_users(rows, chunk_size, hashing_workers=None):
+    errors = []
+    accepted = []
+    emails = set()
+    for index, row in enumerate(rows):
+        serializer = UserImportRowSerializer(data=row)
+        if not serializer.is_valid():
+            errors.append({'row': index, 'errors': serializer.errors})
+        elif serializer.validated_data['email'] in emails:
+            errors.append({'row': index, 'errors': {'email': ['Duplicate email in the import']}})
+        else:
+            emails.add(serializer.validated_data['email'])
+            accepted.append((index, serializer.validated_data))
+
+    existing = set(AkvelonUser.objects.filter(email__in=emails).values_list('email', flat=True))
+    new_rows = []
+    for index, data in accepted:
+        if data['email'] in existing:
+            errors.append({'row': index, 'errors': {'email': ['User with this email already exists']}})
+        else:
+            new_rows.append((index, data))
+
+    passwords = [data['password'] for _, data in new_rows]
+    if hashing_workers is None:
+        passwords = hash_passwords_pooled(passwords, settings.USERS_IMPORT_HASHING_BATCH_SIZE)
+    else:
+        passwords = hash_passwords(passwords, hashing_workers)
+    created = 0
+    for start in range(0, len(new_rows), chunk_size):
+        chunk = [(index, AkvelonUser(**dict(data, password=password)))
+                 for (index, data), password in zip(new_rows[start:start + chunk_size],
+                                                    passwords[start:start + chunk_size])]
+        created += insert_users(chunk, errors)
+    errors.sort(key=lambda error: error['row'])
+    return created, errors
+
+
+"""
+    Method for inserting the chunk of the users. The users created concurrently after the emails check
+    make the chunk fail, then they are reported as the existing ones and the rest of the chunk is inserted
+    again. If the chunk fails for another reason, the users are inserted one by one and the failed ones
+    are reported
+"""
+def insert_users(chunk, errors):
+    while chunk:
+        try:
+            with transaction.atomic():
+                AkvelonUser.objects.bulk_create([user for _, user in chunk])
+            return len(chunk)
+        except IntegrityError:
+            existing = set(AkvelonUser.objects.filter(email__in=[user.email for _, user in chunk])
+                           .values_list('email', flat=True))
+            if not existing:
+                return insert_users_one_by_one(chunk, errors)
+            for index, user in chunk:
+                if user.email in existing:
+                    errors.append({'row': index, 'errors': {'email': ['User with this email already exists']}})
+            chunk = [(index, user) for index, user in chunk if user.email not in existing]
+    return 0
+
+
+def insert_users_one_by_one(chunk, errors):
+    created = 0
+    for index, user in chunk:
+        try:
+            with transaction.atomic():
+                AkvelonUser.objects.bulk_create([user])
+            created += 1
+        except IntegrityError:
+            if AkvelonUser.objects.filter(email=user.email).exists():
+                errors.append({'row': index, 'errors': {'email': ['User with this email already exists']}})
+            else:
+                errors.append({'row': index, 'errors': {'non_field_errors': ['User can not be created']}})
+    return created
@@ -0,0 +1,165 @@
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection, transaction
+
+"""
+    Cache of the serialized users (UserGetSerializer payloads). Payloads are stored by the user id and
+    the version of the user, the email key stores only the id of the user. Every save or delete of the user
+    replaces the version (see api/signals.py), immediately and once more after the commit, so the payload
+    loaded before the change and stored after the invalidation is never read. The same cache keeps
+    the fields of the authenticated users (see api/authentication.py).
+    The invalidation must reach every worker process, so the caches are used only with the shared backend
+    (Redis, memcached, file based), the process local LocMemCache is allowed by USER_CACHE_ALLOW_PROCESS_LOCAL
+    for the single process runs only
+"""
+
+USER_VERSION_KEY = 'user:version:{}'
+USER_BY_ID_KEY = 'user:id:{}:{}'
+USER_BY_EMAIL_KEY = 'user:email:{}'
+AUTH_USER_KEY = 'user:auth:{}:{}'
+# Fields of the authenticated user kept in the cache, the password hash and the other fields are not cached
+AUTH_USER_FIELDS = ('id', 'email', 'first_name', 'last_name', 'is_admin', 'is_active', 'is_staff', 'is_superuser')
+
+
+"""
+    Process local counters of the cache hits and misses
+"""
+class CacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def as_dict(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else None,
+        }
+
+
+user_cache_stats = CacheStats()
+auth_cache_stats = CacheStats()
+
+
+def get_user_cache():
+    return caches[settings.USER_CACHE_ALIAS]
+
+
+def is_user_cache_enabled():
+    return settings.USER_CACHE_ALLOW_PROCESS_LOCAL or not isinstance(get_user_cache(), LocMemCache)
+
+
+"""
+    Function for getting the current version of the user, the versions never expire and are never reused
+"""
+def get_user_version(cache, user_id):
+    key = USER_VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+"""
+    Function for getting the serialized user by the id, loader is called on the cache miss and
+    returns the serialized user. The version is read before the loader is called
+"""
+def get_user_payload_by_id(user_id, loader):
+    if not is_user_cache_enabled():
+        return loader()
+    cache = get_user_cache()
+    version = get_user_version(cache, user_id)
+    data = cache.get(USER_BY_ID_KEY.format(user_id, version))
+    if data is not None:
+        user_cache_stats.hit()
+        return data
+    user_cache_stats.miss()
+    data = loader()
+    cache.set_many({
+        USER_BY_ID_KEY.format(data['id'], version): dict(data),
+        USER_BY_EMAIL_KEY.format(data['email']): data['id'],
+    })
+    return data
+
+
+"""
+    Function for getting the serialized user by the email, the cached payload is used only if its email
+    still matches, so the old email of the changed user is never resolved from the cache. When the id
+    of the email is not known yet, only the email key is stored, as the version could not be read before
+    the loader
+"""
+def get_user_payload_by_email(email, loader):
+    if not is_user_cache_enabled():
+        return loader()
+    cache = get_user_cache()
+    user_id = cache.get(USER_BY_EMAIL_KEY.format(email))
+    if user_id is None:
+        user_cache_stats.miss()
+        data = loader()
+        cache.set(USER_BY_EMAIL_KEY.format(email), data['id'])
+        return data
+    version = get_user_version(cache, user_id)
+    data = cache.get(USER_BY_ID_KEY.format(user_id, version))
+    if data is not None and data['email'] == email:
+        user_cache_stats.hit()
+        return data
+    user_cache_stats.miss()
+    data = loader()
+    cache.set_many({
+        USER_BY_ID_KEY.format(data['id'], version): dict(data),
+        USER_BY_EMAIL_KEY.format(data['email']): data['id'],
+    })
+    return data
+
+
+"""
+    Function for getting the authenticated user by the id, loader is called on the cache miss and
+    returns the user instance. Only AUTH_USER_FIELDS are cached, the user is restored with the other
+    fields deferred, so they are loaded from the database if they are ever accessed
+"""
+def get_auth_user(user_id, loader):
+    if not is_user_cache_enabled():
+        return loader()
+    cache = get_user_cache()
+    key = AUTH_USER_KEY.format(user_id, get_user_version(cache, user_id))
+    values = cache.get(key)
+    if values is not None:
+        auth_cache_stats.hit()
+        from .models import AkvelonUser
+        return AkvelonUser.from_db(AkvelonUser.objects.db, AUTH_USER_FIELDS, values)
+    auth_cache_stats.miss()
+    user = loader()
+    cache.set(key, [getattr(user, field) for field in AUTH_USER_FIELDS], settings.AUTH_USER_CACHE_TIMEOUT)
+    return user
+
+
+"""
+    Function for invalidating the cached user by replacing its version. Inside the database transaction
+    the version is replaced once more after the commit, so the payloads loaded from the not yet committed
+    state are dropped too
+"""
+def invalidate_user(user):
+    if not is_user_cache_enabled():
+        return
+    _replace_user_version(user.pk)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _replace_user_version(user.pk))
+
+
+def _replace_user_version(user_id):
+    get_user_cache().set(USER_VERSION_KEY.format(user_id), uuid.uuid4().hex, None)
@@ -0,0 +1,19 @@
+from django.core.checks import Tags, Warning, register
+
+from .cache import is_user_cache_enabled
+
+"""
+    System check which warns that the users caches are disabled (see api/cache.py), so the user lookups and
+    the JWT authentication query the database on every request
+"""
+@register(Tags.caches)
+def check_user_cache(app_configs, **kwargs):
+    if is_user_cache_enabled():
+        return []
+    return [Warning(
+        'Users cache is disabled, because its backend is the process local LocMemCache',
+        hint='Set USER_CACHE_BACKEND to the shared backend (e.g. django_redis.cache.RedisCache or '
+             'django.core.cache.backends.filebased.FileBasedCache with USER_CACHE_LOCATION), or set '
+             'USER_CACHE_ALLOW_PROCESS_LOCAL=true for the single process runs',
+        id='api.W001',
+    )]
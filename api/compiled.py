@@ -0,0 +1,141 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import ForeignObjectRel, Prefetch
+from rest_framework import serializers
+
+"""
+    Compiled read-only serializers. The readable fields of a ModelSerializer are turned once per request
+    into a flat plan of (output name, values() column, converter), the rows are fetched with .values()
+    and converted by the plan into plain dicts, so no model instances or bound serializers are created
+    per row. Converters are the to_representation() methods of the same serializer fields, so the output
+    is the same as the output of the serializer itself
+"""
+
+# Serializer fields whose to_representation() returns the database value of the matching type as is
+PASSTHROUGH_FIELDS = (
+    serializers.CharField,
+    serializers.EmailField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+    serializers.ReadOnlyField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+VALUE, NESTED, RELATED, METHOD = 'value', 'nested', 'related', 'method'
+
+
+class UncompilableSerializer(Exception):
+    pass
+
+
+"""
+    Plan of one serializer, which is built from its readable fields and the model of its Meta
+"""
+class CompiledSerializer:
+    def __init__(self, serializer, prefix=''):
+        self.model = serializer.Meta.model
+        self.prefix = prefix
+        self.pk_column = prefix + self.model._meta.pk.name
+        self.columns = []
+        # (output name, kind, column or relation, converter or nested plan)
+        self.fields = []
+        self.related_querysets = {}
+        for field in serializer.fields.values():
+            if not field.write_only:
+                self.compile_field(field)
+        kinds = {kind for _, kind, _, _ in self.fields}
+        if kinds & {METHOD, RELATED} and self.pk_column not in self.columns:
+            self.columns.append(self.pk_column)
+
+    def compile_field(self, field):
+        if isinstance(field, serializers.SerializerMethodField):
+            self.fields.append((field.field_name, METHOD, None, field.to_representation))
+            return
+        if field.source == '*' or '.' in field.source:
+            raise UncompilableSerializer(f'Source of the field {field.field_name} is not a model field')
+        try:
+            model_field = self.model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            raise UncompilableSerializer(f'Source of the field {field.field_name} is not a model field')
+
+        column = self.prefix + field.source
+        if isinstance(field, serializers.ListSerializer) and isinstance(model_field, ForeignObjectRel):
+            self.fields.append((field.field_name, RELATED, model_field, CompiledSerializer(field.child)))
+        elif isinstance(field, serializers.BaseSerializer) and model_field.many_to_one:
+            child = CompiledSerializer(field, prefix=column + '__')
+            if any(kind != VALUE for _, kind, _, _ in child.fields):
+                raise UncompilableSerializer(f'Nested serializer {field.field_name} is too deep')
+            self.columns.append(column)
+            self.columns.extend(child.columns)
+            self.fields.append((field.field_name, NESTED, column, child))
+        elif isinstance(field, serializers.BaseSerializer) or model_field.is_relation and not model_field.many_to_one:
+            raise UncompilableSerializer(f'Relation {field.field_name} is not supported')
+        else:
+            self.columns.append(column)
+            convert = None if type(field) in PASSTHROUGH_FIELDS else field.to_representation
+            self.fields.append((field.field_name, VALUE, column, convert))
+
+    """
+        Method for selecting the columns of the plan from the queryset. Prefetch lookups of the related
+        lists are taken from the queryset, so their filters are kept
+    """
+    def values(self, queryset):
+        for lookup in queryset._prefetch_related_lookups:
+            if isinstance(lookup, Prefetch) and lookup.queryset is not None:
+                self.related_querysets[lookup.prefetch_to] = lookup.queryset
+        return queryset.prefetch_related(None).values(*self.columns)
+
+    """
+        Method for converting the fetched rows, related lists are loaded by one query per relation
+    """
+    def serialize(self, rows):
+        rows = list(rows)
+        related = {name: self.load_related(rows, rel, child)
+                   for name, kind, rel, child in self.fields if kind == RELATED}
+        return [self.to_representation(row, related) for row in rows]
+
+    def to_representation(self, row, related=None):
+        instance = None
+        data = {}
+        for name, kind, column, convert in self.fields:
+            if kind == VALUE:
+                value = row[column]
+                data[name] = value if convert is None or value is None else convert(value)
+            elif kind == NESTED:
+                data[name] = None if row[column] is None else convert.to_representation(row)
+            elif kind == METHOD:
+                if instance is None:
+                    instance = self.build_instance(row)
+                data[name] = convert(instance)
+            else:
+                data[name] = related[name].get(row[self.pk_column], [])
+        return data
+
+    def load_related(self, rows, rel, child):
+        queryset = self.related_querysets.get(rel.get_accessor_name())
+        if queryset is None:
+            queryset = rel.related_model._default_manager.all()
+        fk_name = rel.field.name
+        grouped = {}
+        pks = [row[self.pk_column] for row in rows]
+        for row in queryset.filter(**{fk_name + '__in': pks}).values(fk_name, *child.columns):
+            grouped.setdefault(row[fk_name], []).append(child.to_representation(row))
+        return grouped
+
+    """
+        Method for building the unsaved model instance for the method fields from the selected columns
+    """
+    def build_instance(self, row):
+        attnames = {field.name: field.attname for field in self.model._meta.concrete_fields}
+        return self.model(**{attnames[column]: value for column, value in row.items() if column in attnames})
+
+
+"""
+    Function for compiling the serializer class in the same context as the view would serialize with,
+    returns None if the serializer has fields which can not be read with .values()
+"""
+def compile_serializer(serializer_class, context=None):
+    try:
+        return CompiledSerializer(serializer_class(context=context))
+    except UncompilableSerializer:
+        return None
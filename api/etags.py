@@ -0,0 +1,25 @@
+import hashlib
+
+from .models import AkvelonUser
+
+"""
+    Strong ETags of the per user transaction endpoints. The tag is calculated from the transactions
+    version of the user (incremented in the same database transaction as every transaction write),
+    the user fields included into the responses and the request parameters, so it requires one
+    primary key lookup instead of the transactions prefetch or aggregation
+"""
+
+ETAG_USER_FIELDS = ('transactions_version', 'email', 'first_name', 'last_name')
+
+
+def user_transactions_etag(request, *args, **kwargs):
+    values = AkvelonUser.objects.filter(pk=kwargs.get('pk')).values_list(*ETAG_USER_FIELDS).first()
+    if values is None:
+        return None
+    tag = '|'.join(map(str, (
+        request.path,
+        request.META.get('QUERY_STRING', ''),
+        request.META.get('HTTP_ACCEPT', ''),
+        *values
+    )))
+    return '"{}"'.format(hashlib.sha1(tag.encode('utf-8')).hexdigest())
@@ -0,0 +1,11 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+"""
+    Exception for the rejected password hashing, the wait attribute is sent as the Retry-After header
+"""
+class PasswordHashingUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Password hashing is overloaded, try again later.'
+    default_code = 'password_hashing_unavailable'
+    wait = 1
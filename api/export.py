@@ -0,0 +1,44 @@
+import csv
+import json
+
+from .amounts import from_minor_units
+
+"""
+    Streaming export of the transactions. Rows are read through the server-side cursor by chunks
+    as plain tuples, so the memory usage does not depend on the number of exported transactions
+"""
+
+EXPORT_FIELDS = ('id', 'user_id', 'date', 'amount')
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+"""
+    Pseudo buffer for the csv writer which returns the written line instead of storing it
+"""
+class Echo:
+    def write(self, value):
+        return value
+
+
+def export_transactions(queryset, output_format='csv', chunk_size=2000):
+    rows = queryset.order_by('id').values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    if output_format == 'csv':
+        return _csv_lines(rows)
+    if output_format == 'ndjson':
+        return _ndjson_lines(rows)
+    raise ValueError(f'Unknown export format {output_format}')
+
+
+def _csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for id, user_id, date, amount in rows:
+        yield writer.writerow((id, user_id, date, from_minor_units(amount)))
+
+
+def _ndjson_lines(rows):
+    for id, user_id, date, amount in rows:
+        yield json.dumps({'id': id, 'user_id': user_id, 'date': date.isoformat(), 'amount': float(from_minor_units(amount))}) + '\n'
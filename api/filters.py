@@ -0,0 +1,59 @@
+from django.db.models import Q
+from django_filters import rest_framework as filters
+
+from .models import AkvelonUser, Transaction
+
+"""
+    Custom Filter class for filtering transactions by the date
+"""
+
+
+class TransactionsDateFilter(filters.FilterSet):
+    from_date = filters.DateFilter(field_name="date", lookup_expr='gte')
+    to_date = filters.DateFilter(field_name="date", lookup_expr='lte')
+
+    class Meta:
+        model = Transaction
+        fields = ['date']
+
+
+"""
+    Filter class for the transactions export, which extends the date filter with the transaction
+    type (income / outcome) and the user given by the id or email
+"""
+
+
+class TransactionsExportFilter(TransactionsDateFilter):
+    type = filters.ChoiceFilter(choices=(('income', 'income'), ('outcome', 'outcome')), method='filter_type')
+    user = filters.CharFilter(method='filter_user')
+
+    def filter_type(self, queryset, name, value):
+        if value == 'income':
+            return queryset.filter(amount__gt=0)
+        return queryset.filter(amount__lt=0)
+
+    def filter_user(self, queryset, name, value):
+        try:
+            return queryset.filter(user_id=int(value))
+        except ValueError:
+            return queryset.filter(user__email=value)
+
+
+"""
+    Filter class for the users list, q searches the substring (so the prefix too) of the email, first name or
+    last name ignoring the case, the lookups are served by the trigram indexes on PostgreSQL
+"""
+
+
+class UsersSearchFilter(filters.FilterSet):
+    q = filters.CharFilter(method='search')
+
+    class Meta:
+        model = AkvelonUser
+        fields = []
+
+    def search(self, queryset, name, value):
+        value = value.strip()
+        if not value:
+            return queryset
+        return queryset.filter(Q(email__icontains=value) | Q(first_name__icontains=value) | Q(last_name__icontains=value))
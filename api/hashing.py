@@ -0,0 +1,214 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+from .exceptions import PasswordHashingUnavailable
+
+"""
+    Bounded process pool for the password hashing and verification. PBKDF2 is deliberately slow, so it is
+    moved out of the request worker, and the number of the submitted but not finished tasks is limited by
+    PASSWORD_HASHING_QUEUE_DEPTH: when the pool is saturated the request is rejected at once with 503 instead
+    of waiting behind the queue. Every request worker process has its own pool, which is created on the first use.
+    With PASSWORD_HASHING_WORKERS = 0 the hashing is done inline
+"""
+
+
+def _init_worker(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def _make_password(password):
+    started = time.time()
+    return started, make_password(password)
+
+
+def _make_passwords(passwords):
+    started = time.time()
+    return started, [make_password(password) for password in passwords]
+
+
+def _check_password(password, encoded):
+    started = time.time()
+    return started, check_password(password, encoded)
+
+
+"""
+    Counters of the pool tasks, the wait time is the time from the submission to the start in the pool process
+"""
+class HashingStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.monotonic()
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.pending = 0
+        self.max_pending = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.busy_time = 0.0
+
+    def submit(self):
+        with self._lock:
+            self.submitted += 1
+            self.pending += 1
+            self.max_pending = max(self.max_pending, self.pending)
+
+    def finish(self, wait_time, busy_time):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+            self.wait_time += wait_time
+            self.max_wait_time = max(self.max_wait_time, wait_time)
+            self.busy_time += busy_time
+
+    def fail(self):
+        with self._lock:
+            self.pending -= 1
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    def time_out(self):
+        with self._lock:
+            self.timed_out += 1
+
+    def as_dict(self):
+        workers = settings.PASSWORD_HASHING_WORKERS
+        elapsed = time.monotonic() - self.started_at
+        return {
+            'workers': workers,
+            'queue_depth': settings.PASSWORD_HASHING_QUEUE_DEPTH,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out,
+            'pending': self.pending,
+            'max_pending': self.max_pending,
+            'utilisation': self.busy_time / (elapsed * workers) if workers and elapsed else None,
+            'avg_wait_time': self.wait_time / self.completed if self.completed else None,
+            'max_wait_time': self.max_wait_time,
+        }
+
+
+hashing_stats = HashingStats()
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+"""
+    Function for getting the pool of the current process, the pool inherited by the forked process is not usable
+"""
+def get_executor():
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASHING_WORKERS,
+                initializer=_init_worker,
+                initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'akvelonTestTask.settings'),),
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _run(function, *args):
+    if not settings.PASSWORD_HASHING_WORKERS:
+        return function(*args)[1]
+    return _result(_submit(function, *args), settings.PASSWORD_HASHING_TIMEOUT)
+
+
+"""
+    Function for submitting the task to the pool of the current process, the task is rejected at once
+    if PASSWORD_HASHING_QUEUE_DEPTH tasks are already pending
+"""
+def _submit(function, *args):
+    with _executor_lock:
+        if hashing_stats.pending >= settings.PASSWORD_HASHING_QUEUE_DEPTH:
+            hashing_stats.reject()
+            raise PasswordHashingUnavailable()
+        hashing_stats.submit()
+    submitted = time.time()
+    try:
+        future = get_executor().submit(function, *args)
+    except Exception:
+        hashing_stats.fail()
+        raise
+
+    def done(future):
+        if future.cancelled() or future.exception() is not None:
+            hashing_stats.fail()
+            return
+        started = future.result()[0]
+        hashing_stats.finish(max(started - submitted, 0.0), max(time.time() - started, 0.0))
+
+    future.add_done_callback(done)
+    return future
+
+
+def _result(future, timeout):
+    try:
+        return future.result(timeout=timeout)[1]
+    except TimeoutError:
+        hashing_stats.time_out()
+        raise PasswordHashingUnavailable()
+
+
+def hash_password(password):
+    return _run(_make_password, password)
+
+
+def verify_password(password, encoded):
+    return _run(_check_password, password, encoded)
+
+
+"""
+    Function for hashing the passwords of the users import request in the shared pool. The passwords are
+    hashed by the batches of batch_size and at most PASSWORD_HASHING_WORKERS batches are submitted at once,
+    so the login requests are queued between the batches instead of behind the whole import
+"""
+def hash_passwords_pooled(passwords, batch_size):
+    passwords = list(passwords)
+    if not settings.PASSWORD_HASHING_WORKERS:
+        return _make_passwords(passwords)[1]
+    batches = [passwords[start:start + batch_size] for start in range(0, len(passwords), batch_size)]
+    pending = deque()
+    hashed = []
+    try:
+        for batch in batches:
+            if len(pending) >= settings.PASSWORD_HASHING_WORKERS:
+                hashed.extend(_result(pending.popleft(), settings.PASSWORD_HASHING_TIMEOUT * batch_size))
+            pending.append(_submit(_make_passwords, batch))
+        while pending:
+            hashed.extend(_result(pending.popleft(), settings.PASSWORD_HASHING_TIMEOUT * batch_size))
+    finally:
+        for future in pending:
+            future.cancel()
+    return hashed
+
+
+"""
+    Function for hashing many passwords at once (e.g. for the users import command) in the separate pool
+    of the workers processes, which does not take the places of the login requests in the shared pool
+"""
+def hash_passwords(passwords, workers):
+    passwords = list(passwords)
+    if workers <= 1 or len(passwords) < 2:
+        return _make_passwords(passwords)[1]
+    # Several batches per worker, so the workers finish at about the same time
+    size = -(-len(passwords) // (workers * 4))
+    batches = [passwords[start:start + size] for start in range(0, len(passwords), size)]
+    with ProcessPoolExecutor(max_workers=min(workers, len(batches)), initializer=_init_worker,
+                             initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'akvelonTestTask.settings'),)) as executor:
+        return [encoded for _, batch in executor.map(_make_passwords, batches) for encoded in batch]
@@ -0,0 +1,131 @@
+from django.db import connection
+from django.utils.dateparse import parse_date
+
+from .amounts import AMOUNT_DECIMAL_PLACES
+from .models import AkvelonUser, Transaction
+
+"""
+    PostgreSQL fast path of the user transactions endpoints. The JSON text of UserTransactionsSerializer
+    is built by the database: the user object is selected as one text row and the transactions as one
+    text row each, which are read through the server-side cursor and streamed as they are, so no model
+    instances, dicts or serializers are created for the transactions. The text is byte identical to the
+    rendered serializer response: the separators are written out without the spaces of json_build_object(),
+    the strings are escaped like JSONRenderer does, and the amounts are formatted like the float values
+    which DecimalField(coerce_to_string=False) gives to the renderer
+"""
+
+# Amounts with less than 16 digits are printed by repr(float) as the exact decimal value, the users whose
+# totals reach this number of the minor units are served by the serializer
+JSON_AGG_MAX_AMOUNT = 10 ** 15
+
+TRANSACTIONS_TYPE_CONDITIONS = {
+    None: '',
+    'income': ' AND t.amount > 0',
+    'outcome': ' AND t.amount < 0',
+}
+
+# JSON string like JSONRenderer renders it: to_json() escapes the same characters as json.dumps(), and the
+# line and paragraph separators are escaped by the renderer for JavaScript
+JSON_STRING_SQL = r"replace(replace(to_json({})::text, chr(8232), '\u2028'), chr(8233), '\u2029')"
+
+# Amount in the minor units as repr(float) of the decimal value: the integer part, the point and
+# the fraction digits without the trailing zeros (at least one digit)
+AMOUNT_SQL = """
+    CASE WHEN t.amount < 0 THEN '-' ELSE '' END || (abs(t.amount) / {minor_units})::text || '.' || COALESCE(
+        NULLIF(rtrim(lpad(mod(abs(t.amount), {minor_units})::text, {decimal_places}, '0'), '0'), ''), '0'
+    )
+"""
+
+USER_SQL = """
+    SELECT '{{"id":' || u.id || ',"email":' || {email} || ',"first_name":' || {first_name}
+           || ',"last_name":' || {last_name} || ',"transactions":[',
+           u.income_total, u.outcome_total
+    FROM {user_table} u
+    WHERE u.id = %s
+"""
+
+TRANSACTIONS_SQL = """
+    SELECT '{{"id":' || t.id || ',"date":' || to_json(t.date)::text || ',"amount":' || {amount} || '}}'
+    FROM {transaction_table} t
+    WHERE t.user_id = %s{conditions}
+    ORDER BY t.id
+"""
+
+
+def is_json_agg_supported():
+    return connection.vendor == 'postgresql'
+
+
+"""
+    Function for getting the beginning of the JSON text of the user, returns None if the user does not exist
+    or has too large amounts, such requests are handled by the serializer path
+"""
+def user_transactions_head(user_id):
+    sql = USER_SQL.format(
+        email=JSON_STRING_SQL.format('u.email'),
+        first_name=JSON_STRING_SQL.format('u.first_name'),
+        last_name=JSON_STRING_SQL.format('u.last_name'),
+        user_table=connection.ops.quote_name(AkvelonUser._meta.db_table),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_id])
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    head, income_total, outcome_total = row
+    if income_total >= JSON_AGG_MAX_AMOUNT or -outcome_total >= JSON_AGG_MAX_AMOUNT:
+        return None
+    return head
+
+
+"""
+    Generator of the JSON text of the user transactions which starts with the head got by
+    user_transactions_head(), the transactions are fetched and yielded by chunks of chunk_size rows.
+    Dates are expected to be validated by parse_json_agg_dates()
+"""
+def user_transactions_json(user_id, head, from_date=None, to_date=None, transactions_type=None, chunk_size=2000):
+    conditions = TRANSACTIONS_TYPE_CONDITIONS[transactions_type]
+    params = [user_id]
+    if from_date is not None:
+        conditions += ' AND t.date >= %s'
+        params.append(from_date)
+    if to_date is not None:
+        conditions += ' AND t.date <= %s'
+        params.append(to_date)
+    sql = TRANSACTIONS_SQL.format(
+        amount=AMOUNT_SQL.format(minor_units=10 ** AMOUNT_DECIMAL_PLACES, decimal_places=AMOUNT_DECIMAL_PLACES),
+        transaction_table=connection.ops.quote_name(Transaction._meta.db_table),
+        conditions=conditions,
+    )
+    yield head
+    separator = ''
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield separator + ','.join(row[0] for row in rows)
+            separator = ','
+    yield ']}'
+
+
+"""
+    Function for parsing the date filters, returns None if some of them is not a valid date, so the
+    request is handled by the serializer path with its usual error handling
+"""
+def parse_json_agg_dates(query_params):
+    dates = []
+    for name in ('from_date', 'to_date'):
+        value = query_params.get(name)
+        if value is None:
+            dates.append(None)
+            continue
+        try:
+            date = parse_date(value)
+        except ValueError:
+            date = None
+        if date is None:
+            return None
+        dates.append(date)
+    return dates
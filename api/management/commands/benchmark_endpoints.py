@@ -0,0 +1,271 @@
+import io
+import json
+import statistics
+import time
+import tracemalloc
+from itertools import count
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (CaptureQueriesContext, setup_databases, setup_test_environment, teardown_databases,
+                               teardown_test_environment)
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api import urls as api_urls
+from api.models import AkvelonUser, Transaction
+
+DEFAULT_BUDGETS = settings.BASE_DIR / 'benchmarks' / 'endpoint_budgets.json'
+# Headroom of the budgets written by --update-budgets, the query counts are kept exact
+WALL_TIME_HEADROOM = 3
+WALL_TIME_SLACK_MS = 20
+PEAK_MEMORY_HEADROOM = 1.5
+
+"""
+    Command for benchmarking every route of api/urls.py through the Django test client on the test database
+    seeded by the seed command. Wall time (median), number of SQL queries (maximal) and peak Python memory
+    of every scenario are compared with the checked-in budgets, the command fails if any of them is exceeded,
+    the response status is not the expected one or some route has no scenario. The wall time and memory
+    budgets depend on the dataset size, so they are checked only on the dataset the budgets were recorded on
+"""
+class Command(BaseCommand):
+    help = 'Benchmark every API route on the seeded test database and check the budgets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, help='number of seeded users, taken from the budgets by default')
+        parser.add_argument('--transactions', type=int,
+                            help='number of seeded transactions, taken from the budgets by default')
+        parser.add_argument('--repeat', type=int, default=5, help='number of runs of every scenario')
+        parser.add_argument('--budgets', default=str(DEFAULT_BUDGETS), help='budgets file')
+        parser.add_argument('--update-budgets', action='store_true',
+                            help='write the measured values with the headroom to the budgets file')
+
+    def handle(self, *args, **options):
+        budgets = self.load_budgets(options['budgets'], options['update_budgets'])
+        dataset = {
+            'users': options['users'] or budgets['dataset']['users'],
+            'transactions': options['transactions'] or budgets['dataset']['transactions'],
+        }
+        check_resources = dataset == budgets['dataset']
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            call_command('seed', users=dataset['users'], transactions=dataset['transactions'], seed=1,
+                         stdout=io.StringIO())
+            results = self.run_scenarios(options['repeat'])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        if options['update_budgets']:
+            self.write_budgets(options['budgets'], dataset, results)
+            return
+        self.check_budgets(results, budgets['endpoints'], check_resources)
+
+    def load_budgets(self, path, missing_ok):
+        try:
+            with open(path) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            if missing_ok:
+                return {'dataset': {'users': 200, 'transactions': 20000}, 'endpoints': {}}
+            raise CommandError(f'Budgets file {path} not found, create it with --update-budgets')
+
+    def run_scenarios(self, repeat):
+        scenarios = Scenarios()
+        missing = {pattern.name for pattern in api_urls.urlpatterns} - {route for route, _ in scenarios.all()}
+        if missing:
+            raise CommandError(f'Routes without benchmark scenarios: {", ".join(sorted(missing))}')
+
+        results = {}
+        tracemalloc.start()
+        for route, scenario in scenarios.all():
+            timings = []
+            queries = 0
+            for run in range(repeat + 1):
+                request = scenario()
+                tracing = run == repeat
+                if tracing:
+                    tracemalloc.reset_peak()
+                    baseline = tracemalloc.get_traced_memory()[0]
+                else:
+                    tracemalloc.stop()
+                with CaptureQueriesContext(connection) as context:
+                    started = time.perf_counter()
+                    response = request.send()
+                    elapsed = time.perf_counter() - started
+                if tracing:
+                    peak = tracemalloc.get_traced_memory()[1] - baseline
+                else:
+                    tracemalloc.start()
+                    timings.append(elapsed)
+                    queries = max(queries, len(context.captured_queries))
+                if response.status_code != request.expected_status:
+                    raise CommandError(f'{request.name}: {request.method} {request.path} returned '
+                                       f'{response.status_code} instead of {request.expected_status}')
+            results[request.name] = {
+                'wall_ms': round(statistics.median(timings) * 1000, 2),
+                'queries': queries,
+                'peak_kb': round(peak / 1024, 1),
+            }
+            self.stdout.write(f'{request.name:<40} {results[request.name]["wall_ms"]:>9.2f} ms '
+                              f'{queries:>4} queries {results[request.name]["peak_kb"]:>10.1f} KiB')
+        tracemalloc.stop()
+        return results
+
+    def check_budgets(self, results, budgets, check_resources):
+        failures = []
+        for name, result in results.items():
+            budget = budgets.get(name)
+            if budget is None:
+                failures.append(f'{name}: no budget')
+                continue
+            keys = ('queries', 'wall_ms', 'peak_kb') if check_resources else ('queries',)
+            for key in keys:
+                if result[key] > budget[key]:
+                    failures.append(f'{name}: {key} {result[key]} > {budget[key]}')
+        if not check_resources:
+            self.stdout.write(self.style.WARNING('Dataset differs from the budgets one, only query counts are checked'))
+        if failures:
+            raise CommandError('Budgets exceeded:\n' + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS(f'{len(results)} scenarios are within the budgets'))
+
+    def write_budgets(self, path, dataset, results):
+        endpoints = {
+            name: {
+                'queries': result['queries'],
+                'wall_ms': round(result['wall_ms'] * WALL_TIME_HEADROOM + WALL_TIME_SLACK_MS),
+                'peak_kb': round(result['peak_kb'] * PEAK_MEMORY_HEADROOM + 64),
+            }
+            for name, result in results.items()
+        }
+        with open(path, 'w') as file:
+            json.dump({'dataset': dataset, 'endpoints': endpoints}, file, indent=4)
+            file.write('\n')
+        self.stdout.write(self.style.SUCCESS(f'Budgets of {len(endpoints)} scenarios written to {path}'))
+
+
+class BenchmarkRequest:
+    def __init__(self, client, name, method, path, data=None, content_type='application/json', expected_status=200):
+        self.client = client
+        self.name = name
+        self.method = method
+        self.path = path
+        self.data = data
+        self.content_type = content_type
+        self.expected_status = expected_status
+
+    def send(self):
+        send = getattr(self.client, self.method.lower())
+        if self.data is None:
+            response = send(self.path)
+        else:
+            data = self.data if isinstance(self.data, str) else json.dumps(self.data)
+            response = send(self.path, data, content_type=self.content_type)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response
+
+
+"""
+    Scenarios of the routes, every scenario is called before every run and returns the request, so the
+    mutating routes get their own object on every run
+"""
+class Scenarios:
+    def __init__(self):
+        self.admin = AkvelonUser.objects.create_superuser('bench-admin@example.com', 'password', 'Bench', 'Admin')
+        self.client = Client(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(self.admin).access_token))
+        self.anonymous = Client()
+        # The first seeded users are the heavy ones (see the seed command)
+        self.user = AkvelonUser.objects.filter(email__startswith='seed-').order_by('pk').first()
+        self.transaction = Transaction.objects.filter(user=self.user).order_by('pk').first()
+        self.numbers = count()
+
+    def request(self, name, method, path, **kwargs):
+        client = kwargs.pop('client', self.client)
+        return BenchmarkRequest(client, name, method, path, **kwargs)
+
+    def new_email(self):
+        return f'bench-{next(self.numbers)}@example.com'
+
+    def new_user(self):
+        return AkvelonUser.objects.create_user(self.new_email(), 'password', 'Bench', 'User')
+
+    def new_transaction(self):
+        return Transaction.objects.create(user=self.user, amount=100)
+
+    def all(self):
+        user = self.user.pk
+        return [
+            ('create_user', lambda: self.request(
+                'create_user', 'POST', reverse('api:create_user'), expected_status=201,
+                data={'email': self.new_email(), 'password': 'password', 'first_name': 'A', 'last_name': 'B'})),
+            ('all_users', lambda: self.request('all_users', 'GET', reverse('api:all_users'))),
+            ('all_users', lambda: self.request(
+                'all_users (sort)', 'GET', reverse('api:all_users') + '?sort=last_name&page_size=100')),
+            ('all_users', lambda: self.request('all_users (search)', 'GET', reverse('api:all_users') + '?q=last1')),
+            ('bulk_create_users', lambda: self.request(
+                'bulk_create_users', 'POST', reverse('api:bulk_create_users'), expected_status=201,
+                data=[{'email': self.new_email(), 'password': 'password', 'first_name': 'A', 'last_name': 'B'}
+                      for _ in range(10)])),
+            ('get_user_by_id', lambda: self.request('get_user_by_id', 'GET', reverse('api:get_user_by_id', args=[user]))),
+            ('get_user_by_email', lambda: self.request(
+                'get_user_by_email', 'GET', reverse('api:get_user_by_email', args=[self.user.email]))),
+            ('update_user', lambda: self.request(
+                'update_user', 'PATCH', reverse('api:update_user', args=[self.new_user().pk]),
+                data={'first_name': 'Updated'})),
+            ('delete_user', lambda: self.request(
+                'delete_user', 'DELETE', reverse('api:delete_user', args=[self.new_user().pk]), expected_status=204)),
+            ('user_balance', lambda: self.request('user_balance', 'GET', reverse('api:user_balance', args=[user]))),
+            ('user_transactions', lambda: self.request(
+                'user_transactions', 'GET', reverse('api:user_transactions', args=[user]))),
+            ('user_income_transactions', lambda: self.request(
+                'user_income_transactions', 'GET', reverse('api:user_income_transactions', args=[user]))),
+            ('user_income_transactions_summary', lambda: self.request(
+                'user_income_transactions_summary', 'GET',
+                reverse('api:user_income_transactions_summary', args=[user]) + '?granularity=month')),
+            ('user_outcome_transactions', lambda: self.request(
+                'user_outcome_transactions', 'GET', reverse('api:user_outcome_transactions', args=[user]))),
+            ('user_outcome_transactions_summary', lambda: self.request(
+                'user_outcome_transactions_summary', 'GET',
+                reverse('api:user_outcome_transactions_summary', args=[user]))),
+            ('create_transaction', lambda: self.request(
+                'create_transaction', 'POST', reverse('api:create_transaction'), expected_status=201,
+                data={'user': user, 'amount': 12.5})),
+            ('bulk_create_transactions', lambda: self.request(
+                'bulk_create_transactions', 'POST', reverse('api:bulk_create_transactions'), expected_status=201,
+                data=[{'user': user, 'amount': number - 50} for number in range(100)])),
+            ('get_transaction', lambda: self.request(
+                'get_transaction', 'GET', reverse('api:get_transaction', args=[self.transaction.pk]))),
+            ('update_transaction', lambda: self.request(
+                'update_transaction', 'PATCH', reverse('api:update_transaction', args=[self.new_transaction().pk]),
+                data={'amount': -3})),
+            ('delete_transaction', lambda: self.request(
+                'delete_transaction', 'DELETE', reverse('api:delete_transaction', args=[self.new_transaction().pk]),
+                expected_status=204)),
+            ('all_transactions', lambda: self.request('all_transactions', 'GET', reverse('api:all_transactions'))),
+            ('all_transactions', lambda: self.request(
+                'all_transactions (flat, amount)', 'GET',
+                reverse('api:all_transactions') + '?user=id&sort=-amount&page_size=1000')),
+            ('export_transactions', lambda: self.request(
+                'export_transactions', 'GET', reverse('api:export_transactions') + f'?user={user}')),
+            ('cache_stats', lambda: self.request('cache_stats', 'GET', reverse('api:cache_stats'))),
+            ('hashing_stats', lambda: self.request('hashing_stats', 'GET', reverse('api:hashing_stats'))),
+            ('metrics', lambda: self.request('metrics', 'GET', reverse('api:metrics'))),
+            ('token_obtain_pair', lambda: self.request(
+                'token_obtain_pair', 'POST', reverse('api:token_obtain_pair'), client=self.anonymous,
+                data={'email': self.admin.email, 'password': 'password'})),
+            ('token_refresh', lambda: self.request(
+                'token_refresh', 'POST', reverse('api:token_refresh'), client=self.anonymous,
+                data={'refresh': str(RefreshToken.for_user(self.admin))})),
+            # The schema route is a non-reversible regular expression
+            ('schema-json', lambda: self.request(
+                'schema-json', 'GET', reverse('api:schema-swagger-ui').rstrip('/') + '.json')),
+            ('schema-swagger-ui', lambda: self.request('schema-swagger-ui', 'GET', reverse('api:schema-swagger-ui'))),
+            ('schema-redoc', lambda: self.request('schema-redoc', 'GET', reverse('api:schema-redoc'))),
+        ]
@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from api.compiled import compile_serializer
+from api.models import AkvelonUser, Transaction
+from api.serializers import TransactionSerializer, TransactionsListSerializer, UserGetSerializer
+
+BENCHMARKS = (
+    ('UserGetSerializer', UserGetSerializer, lambda: AkvelonUser.objects.all()),
+    ('TransactionSerializer', TransactionSerializer, lambda: Transaction.objects.select_related('user')),
+    ('TransactionsListSerializer', TransactionsListSerializer, lambda: Transaction.objects.all()),
+)
+
+"""
+    Command for measuring the CPU time per row of the DRF serializers and their compiled versions
+    (see api/compiled.py). Rows are fetched before the measurement, so only the serialization is timed,
+    and the rendered outputs of both versions are compared
+"""
+class Command(BaseCommand):
+    help = 'Measure the CPU time per row of the DRF and compiled read serializers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='number of serialized rows')
+        parser.add_argument('--repeat', type=int, default=5, help='number of runs of every serializer')
+
+    def handle(self, *args, **options):
+        renderer = JSONRenderer()
+        for name, serializer_class, get_queryset in BENCHMARKS:
+            compiled = compile_serializer(serializer_class)
+            if compiled is None:
+                raise CommandError(f'{name} can not be compiled')
+            queryset = get_queryset().order_by('pk')[:options['rows']]
+            instances = list(queryset)
+            rows = list(compiled.values(queryset))
+            if not rows:
+                self.stdout.write(f'{name}: no rows')
+                continue
+
+            drf_time, drf_data = self.measure(lambda: serializer_class(instances, many=True).data, options['repeat'])
+            compiled_time, compiled_data = self.measure(lambda: compiled.serialize(rows), options['repeat'])
+            if renderer.render(drf_data) != renderer.render(compiled_data):
+                raise CommandError(f'{name}: compiled output differs from the serializer output')
+
+            self.stdout.write(f'{name}: {len(rows)} rows, serializer {drf_time / len(rows) * 1e6:.1f} us/row, '
+                              f'compiled {compiled_time / len(rows) * 1e6:.1f} us/row, '
+                              f'x{drf_time / compiled_time:.1f}')
+
+    def measure(self, serialize, repeat):
+        best = None
+        data = None
+        for _ in range(repeat):
+            started = time.process_time()
+            data = serialize()
+            elapsed = time.process_time() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, data
@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from api.compiled import compile_serializer
+from api.json_agg import is_json_agg_supported, user_transactions_head, user_transactions_json
+from api.models import AkvelonUser, Transaction
+from api.serializers import UserTransactionsSerializer
+
+"""
+    Command for comparing the compiled serializer path of the /user/<pk>/transactions/ endpoint, which
+    serves the JSON responses with TRANSACTIONS_JSON_AGG=false, with the streamed PostgreSQL fast path
+    on the same user
+"""
+class Command(BaseCommand):
+    help = 'Compare the compiled serializer and PostgreSQL paths of the user transactions endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, required=True, help='id of the benchmarked user')
+        parser.add_argument('--repeat', type=int, default=10, help='number of runs of every path')
+
+    def handle(self, *args, **options):
+        if not is_json_agg_supported():
+            raise CommandError('json_agg() path is available only on PostgreSQL')
+        if not AkvelonUser.objects.filter(pk=options['user']).exists():
+            raise CommandError(f'User {options["user"]} does not exist')
+        if user_transactions_head(options['user']) is None:
+            raise CommandError(f'Amounts of the user {options["user"]} are served by the serializer path')
+
+        paths = (
+            ('compiled', lambda: self.render_compiled(options['user'])),
+            ('json_agg', lambda: self.render_json_agg(options['user'])),
+        )
+        contents = set()
+        for name, render in paths:
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                content = render()
+                timings.append(time.perf_counter() - started)
+            timings.sort()
+            contents.add(content)
+            self.stdout.write(f'{name}: best {timings[0] * 1000:.1f} ms, '
+                              f'median {timings[len(timings) // 2] * 1000:.1f} ms, {len(content)} bytes')
+        if len(contents) != 1:
+            raise CommandError('Responses of the paths differ')
+
+    def render_compiled(self, user_id):
+        compiled = compile_serializer(UserTransactionsSerializer)
+        queryset = AkvelonUser.objects.prefetch_related(
+            Prefetch('transactions', queryset=Transaction.objects.all())
+        ).filter(pk=user_id)
+        return JSONRenderer().render(compiled.serialize(compiled.values(queryset))[0])
+
+    def render_json_agg(self, user_id):
+        head = user_transactions_head(user_id)
+        return ''.join(user_transactions_json(user_id, head)).encode()
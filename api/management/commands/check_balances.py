@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+
+from api.models import AkvelonUser, Transaction
+
+"""
+    Command for checking the stored balances of the users against their transactions and
+    fixing the mismatched ones with --fix
+"""
+class Command(BaseCommand):
+    help = 'Check (or fix with --fix) the stored balances of the users against their transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='recalculate the mismatched balances')
+        parser.add_argument('--user', type=int, help='check only the user with this id')
+
+    def handle(self, *args, **options):
+        users = AkvelonUser.objects.all()
+        transactions = Transaction.objects.all()
+        if options['user'] is not None:
+            users = users.filter(pk=options['user'])
+            transactions = transactions.filter(user_id=options['user'])
+
+        expected = {row[0]: row[1:] for row in AkvelonUser.objects.calculate_balances(transactions)}
+        mismatched = []
+        for user_id, *stored in users.values_list('id', *AkvelonUser.BALANCE_FIELDS).iterator():
+            income, outcome = expected.get(user_id, (0, 0))
+            if tuple(stored) != (income + outcome, income, outcome):
+                mismatched.append(user_id)
+                self.stderr.write(f'Balance mismatch for user {user_id}: stored {tuple(stored)}, '
+                                  f'expected {(income + outcome, income, outcome)}')
+
+        if mismatched and options['fix']:
+            for user_id in mismatched:
+                self.fix(user_id)
+            self.stdout.write(self.style.SUCCESS(f'Fixed {len(mismatched)} balances'))
+        elif mismatched:
+            raise CommandError(f'{len(mismatched)} balances do not match the transactions')
+        else:
+            self.stdout.write(self.style.SUCCESS('Balances match the transactions'))
+
+    """
+        Method for recalculating the balance of one user under the lock of the user row, so
+        concurrent transaction writes are applied either before or after the recalculation
+    """
+    def fix(self, user_id):
+        with transaction.atomic():
+            AkvelonUser.objects.select_for_update().filter(pk=user_id).exists()
+            totals = AkvelonUser.objects.calculate_balances(Transaction.objects.filter(user_id=user_id))
+            income, outcome = next((row[1:] for row in totals), (0, 0))
+            AkvelonUser.objects.filter(pk=user_id).update(
+                balance=income + outcome,
+                income_total=income,
+                outcome_total=outcome,
+                transactions_version=F('transactions_version') + 1,
+            )
@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils.http import urlencode
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.models import AkvelonUser
+
+"""
+    Command which requests the read endpoints of the transactions for one user and prints
+    the EXPLAIN plan of every SELECT query executed by them. Run it on the large seeded database
+    to confirm that the queries use index range or index-only scans
+"""
+class Command(BaseCommand):
+    help = 'Print EXPLAIN plans of the queries executed by the transaction endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='id of the user, the user with most transactions by default')
+        parser.add_argument('--from-date', help='from_date filter of the endpoints (e.g. 2021-05-15)')
+        parser.add_argument('--to-date', help='to_date filter of the endpoints (e.g. 2021-05-15)')
+        parser.add_argument('--analyze', action='store_true',
+                            help='execute the queries and show actual timings (PostgreSQL only)')
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        dates = {key: options[key] for key in ('from_date', 'to_date') if options[key]}
+
+        client = Client(HTTP_AUTHORIZATION='Bearer ' + str(RefreshToken.for_user(user).access_token))
+        explain_options = {'analyze': True, 'buffers': True} if options['analyze'] and connection.vendor == 'postgresql' else {}
+        prefix = connection.ops.explain_query_prefix(**explain_options)
+
+        for name, url in self.get_endpoints(user, dates):
+            with override_settings(ALLOWED_HOSTS=['testserver']), CaptureQueriesContext(connection) as context:
+                response = client.get(url)
+                if response.streaming:
+                    for _ in response.streaming_content:
+                        pass
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{name}: GET {url} -> {response.status_code}'))
+            for query in context.captured_queries:
+                if not query['sql'].lstrip().upper().startswith('SELECT'):
+                    continue
+                self.stdout.write(self.style.SQL_KEYWORD(query['sql']))
+                with connection.cursor() as cursor:
+                    cursor.execute(f"{prefix} {query['sql']}")
+                    for row in cursor.fetchall():
+                        self.stdout.write('    ' + ' '.join(str(column) for column in row))
+            self.stdout.write('')
+
+    def get_user(self, user_id):
+        users = AkvelonUser.objects.all()
+        if user_id is None:
+            users = users.annotate(transactions_count=Count('transactions')).order_by('-transactions_count')
+        else:
+            users = users.filter(pk=user_id)
+        user = users.first()
+        if user is None:
+            raise CommandError('User not found')
+        return user
+
+    def get_endpoints(self, user, dates):
+        query = '?' + urlencode(dates) if dates else ''
+        paged = '?' + urlencode(dict(dates, page_size=100))
+        return [
+            ('user_transactions', reverse('api:user_transactions', args=[user.pk]) + query),
+            ('user_income_transactions', reverse('api:user_income_transactions', args=[user.pk]) + query),
+            ('user_outcome_transactions', reverse('api:user_outcome_transactions', args=[user.pk]) + query),
+            ('user_income_transactions_summary', reverse('api:user_income_transactions_summary', args=[user.pk])),
+            ('user_outcome_transactions_summary', reverse('api:user_outcome_transactions_summary', args=[user.pk])),
+            ('all_transactions', reverse('api:all_transactions') + paged),
+            ('all_transactions (income)', reverse('api:all_transactions') + paged + '&type=income'),
+            ('export_transactions', reverse('api:export_transactions') + '?' + urlencode(dict(dates, user=user.pk))),
+        ]
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.export import EXPORT_FORMATS, export_transactions
+from api.filters import TransactionsExportFilter
+from api.models import Transaction
+
+"""
+    Command for the streaming export of the transactions to CSV or NDJSON with the same filters
+    as the export_transactions endpoint
+"""
+class Command(BaseCommand):
+    help = 'Export transactions to CSV or NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv', help='export format')
+        parser.add_argument('--from-date', help='export transactions starting from this date (e.g. 2021-05-15)')
+        parser.add_argument('--to-date', help='export transactions ending to this date (e.g. 2021-05-15)')
+        parser.add_argument('--type', choices=['income', 'outcome'], help='type of the transactions')
+        parser.add_argument('--user', help='id or email of the user')
+        parser.add_argument('--output', help='output file, stdout by default')
+        parser.add_argument('--chunk-size', type=int, default=settings.TRANSACTIONS_EXPORT_CHUNK_SIZE,
+                            help='number of rows fetched from the database at once')
+
+    def handle(self, *args, **options):
+        data = {
+            'from_date': options['from_date'],
+            'to_date': options['to_date'],
+            'type': options['type'],
+            'user': options['user'],
+        }
+        filterset = TransactionsExportFilter(
+            data={key: value for key, value in data.items() if value is not None},
+            queryset=Transaction.objects.all()
+        )
+        if not filterset.is_valid():
+            raise CommandError(filterset.errors.as_text())
+
+        lines = export_transactions(filterset.qs, options['format'], options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='') as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
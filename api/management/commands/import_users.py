@@ -0,0 +1,63 @@
+import csv
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.bulk import import_users
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+
+"""
+    Command for importing the users from the CSV (with the header row) or JSON lines file,
+    the same as the bulk_create_users endpoint
+"""
+class Command(BaseCommand):
+    help = 'Import users from CSV or JSON lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='CSV or JSON lines file with the email, password, first_name and last_name')
+        parser.add_argument('--format', choices=IMPORT_FORMATS,
+                            help='format of the file, taken from the file extension by default')
+        parser.add_argument('--chunk-size', type=int, default=settings.USERS_IMPORT_CHUNK_SIZE,
+                            help='number of users inserted at once')
+        parser.add_argument('--workers', type=int, default=settings.USERS_IMPORT_HASHING_WORKERS,
+                            help='number of processes hashing the passwords')
+
+    def handle(self, *args, **options):
+        import_format = options['format'] or self.guess_format(options['file'])
+        if options['chunk_size'] < 1:
+            raise CommandError('Chunk size must be positive')
+        try:
+            rows = self.read_rows(options['file'], import_format)
+        except OSError as exc:
+            raise CommandError(f'Can not read {options["file"]}: {exc}')
+
+        created, errors = import_users(rows, options['chunk_size'], options['workers'])
+        for error in errors:
+            self.stderr.write(f'Row {error["row"]}: {json.dumps(error["errors"])}')
+        self.stdout.write(self.style.SUCCESS(f'Created {created} users, {len(errors)} rows failed'))
+
+    def guess_format(self, path):
+        extension = os.path.splitext(path)[1].lower()
+        if extension == '.csv':
+            return 'csv'
+        if extension in ('.jsonl', '.ndjson'):
+            return 'jsonl'
+        raise CommandError(f'Can not guess the format of {path}, use --format')
+
+    def read_rows(self, path, import_format):
+        with open(path, encoding='utf-8', newline='') as file:
+            if import_format == 'csv':
+                return [dict(row) for row in csv.DictReader(file)]
+            rows = []
+            for number, line in enumerate(file, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except ValueError as exc:
+                    raise CommandError(f'JSON parse error on line {number} - {exc}')
+            return rows
@@ -0,0 +1,71 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.models import AkvelonUser, Transaction, TransactionDailySummary
+
+"""
+    Command for rebuilding the daily summaries from the raw transactions or verifying that
+    the incrementally maintained summaries match them
+"""
+class Command(BaseCommand):
+    help = 'Rebuild (or verify with --verify) the daily transaction summaries from the raw transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true',
+                            help='only compare the stored summaries with the raw transactions')
+        parser.add_argument('--user', type=int, help='process only transactions of the user with this id')
+        parser.add_argument('--batch-size', type=int, default=1000, help='number of summaries inserted at once')
+
+    def handle(self, *args, **options):
+        transactions = Transaction.objects.all()
+        summaries = TransactionDailySummary.objects.all()
+        if options['user'] is not None:
+            transactions = transactions.filter(user_id=options['user'])
+            summaries = summaries.filter(user_id=options['user'])
+
+        if options['verify']:
+            self.verify(transactions, summaries)
+        else:
+            self.rebuild(transactions, summaries, options['batch_size'], options['user'])
+
+    def rebuild(self, transactions, summaries, batch_size, user_id):
+        calculated = TransactionDailySummary.objects.calculate(transactions)
+        created = 0
+        with transaction.atomic():
+            summaries.delete()
+            while True:
+                batch = list(islice(calculated, batch_size))
+                if not batch:
+                    break
+                TransactionDailySummary.objects.bulk_create(batch)
+                created += len(batch)
+            AkvelonUser.objects.bump_transactions_versions(None if user_id is None else [user_id])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {created} daily summaries'))
+
+    def verify(self, transactions, summaries):
+        stored = {
+            (summary.user_id, summary.date): summary
+            for summary in summaries.filter(income_count__gt=0) | summaries.filter(outcome_count__gt=0)
+        }
+        mismatches = 0
+        for expected in TransactionDailySummary.objects.calculate(transactions):
+            actual = stored.pop((expected.user_id, expected.date), None)
+            if actual is None or not _summaries_equal(expected, actual):
+                mismatches += 1
+                self.stderr.write(f'Mismatch for user {expected.user_id} on {expected.date}')
+        for user_id, date in stored:
+            mismatches += 1
+            self.stderr.write(f'Summary without transactions for user {user_id} on {date}')
+
+        if mismatches:
+            raise CommandError(f'{mismatches} daily summaries do not match the transactions')
+        self.stdout.write(self.style.SUCCESS('Daily summaries match the transactions'))
+
+
+def _summaries_equal(expected, actual):
+    return (expected.income_count == actual.income_count
+            and expected.outcome_count == actual.outcome_count
+            and expected.income_sum == actual.income_sum
+            and expected.outcome_sum == actual.outcome_sum)
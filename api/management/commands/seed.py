@@ -0,0 +1,175 @@
+import csv
+import datetime
+import random
+import time
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.amounts import AMOUNT_DECIMAL_PLACES
+from api.export import Echo
+from api.models import AkvelonUser, Transaction, TransactionDailySummary
+
+"""
+    Command for generating the synthetic users and transactions for the load testing. A part of the users
+    (--heavy-users) gets a part of all transactions (--heavy-share), dates are spread over --days days and
+    --income-ratio of the transactions are incomes. On PostgreSQL the transactions are loaded by COPY FROM STDIN,
+    other databases get the batched INSERTs. The daily summaries and balances of the seeded users are
+    calculated after the load
+"""
+class Command(BaseCommand):
+    help = 'Generate synthetic users and transactions for the load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='number of generated users')
+        parser.add_argument('--transactions', type=int, default=100000, help='number of generated transactions')
+        parser.add_argument('--heavy-users', type=float, default=0.01,
+                            help='fraction of the users which are heavy users')
+        parser.add_argument('--heavy-share', type=float, default=0.5,
+                            help='fraction of the transactions which belong to the heavy users')
+        parser.add_argument('--days', type=int, default=365, help='transactions are spread over this number of days')
+        parser.add_argument('--end-date', type=datetime.date.fromisoformat, default=datetime.date.today(),
+                            help='date of the latest transactions (e.g. 2021-05-31), today by default')
+        parser.add_argument('--income-ratio', type=float, default=0.3, help='fraction of the income transactions')
+        parser.add_argument('--max-amount', type=int, default=1000, help='maximal absolute amount of the transaction')
+        parser.add_argument('--password', default='password', help='password of every generated user')
+        parser.add_argument('--email-prefix', default='seed', help='prefix of the generated emails')
+        parser.add_argument('--seed', type=int, help='seed of the random generator')
+        parser.add_argument('--batch-size', type=int, default=10000, help='number of rows inserted at once')
+
+    def handle(self, *args, **options):
+        self.validate(options)
+        rand = random.Random(options['seed'])
+        started = time.monotonic()
+
+        user_ids = self.create_users(options)
+        self.stdout.write(f'Created {len(user_ids)} users')
+
+        rows = generate_transactions(rand, user_ids, options)
+        if connection.vendor == 'postgresql':
+            self.copy_transactions(rows)
+        else:
+            self.insert_transactions(rows, options['batch_size'])
+        self.stdout.write(f'Loaded {options["transactions"]} transactions')
+
+        self.calculate_totals(user_ids, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Seeded in {time.monotonic() - started:.1f} s'))
+
+    def validate(self, options):
+        if options['users'] < 1 or options['transactions'] < 0 or options['days'] < 1:
+            raise CommandError('Numbers of users and days must be positive, number of transactions non-negative')
+        if options['max_amount'] < 1 or options['batch_size'] < 1:
+            raise CommandError('Maximal amount and batch size must be positive')
+        for name in ('heavy_users', 'heavy_share', 'income_ratio'):
+            if not 0 <= options[name] <= 1:
+                raise CommandError(f'--{name.replace("_", "-")} must be between 0 and 1')
+
+    """
+        Method for creating the users, the password is hashed once for all of them
+    """
+    def create_users(self, options):
+        password = make_password(options['password'])
+        run = format(int(time.time() * 1000), 'x')
+        prefix = f'{options["email_prefix"]}-{run}-'
+        users = (
+            AkvelonUser(email=f'{prefix}{number}@example.com', password=password,
+                        first_name=f'First{number}', last_name=f'Last{number}')
+            for number in range(options['users'])
+        )
+        while True:
+            batch = list(islice(users, options['batch_size']))
+            if not batch:
+                break
+            AkvelonUser.objects.bulk_create(batch)
+        return list(AkvelonUser.objects.filter(email__startswith=prefix).order_by('pk').values_list('pk', flat=True))
+
+    def copy_transactions(self, rows):
+        table = connection.ops.quote_name(Transaction._meta.db_table)
+        columns = ', '.join(connection.ops.quote_name(Transaction._meta.get_field(name).column)
+                            for name in ('user', 'date', 'amount'))
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.copy_expert(f'COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)', CSVStream(rows))
+
+    def insert_transactions(self, rows, batch_size):
+        table = connection.ops.quote_name(Transaction._meta.db_table)
+        columns = ', '.join(connection.ops.quote_name(Transaction._meta.get_field(name).column)
+                            for name in ('user', 'date', 'amount'))
+        sql = f'INSERT INTO {table} ({columns}) VALUES (%s, %s, %s)'
+        with transaction.atomic(), connection.cursor() as cursor:
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                cursor.executemany(sql, batch)
+
+    """
+        Method for calculating the daily summaries and balances of the seeded users from their transactions,
+        the transactions versions of the users are incremented, so the ETags are changed too. The users are
+        processed by the batches of their ids, as the ids of the seeded users are not always contiguous
+    """
+    def calculate_totals(self, user_ids, batch_size):
+        with transaction.atomic():
+            for start in range(0, len(user_ids), batch_size):
+                batch_ids = user_ids[start:start + batch_size]
+                transactions = Transaction.objects.filter(user_id__in=batch_ids)
+                TransactionDailySummary.objects.filter(user_id__in=batch_ids).delete()
+                summaries = TransactionDailySummary.objects.calculate(transactions)
+                while True:
+                    batch = list(islice(summaries, batch_size))
+                    if not batch:
+                        break
+                    TransactionDailySummary.objects.bulk_create(batch)
+
+                AkvelonUser.objects.bulk_update([
+                    AkvelonUser(pk=user_id, balance=income + outcome, income_total=income, outcome_total=outcome)
+                    for user_id, income, outcome in AkvelonUser.objects.calculate_balances(transactions)
+                ], AkvelonUser.BALANCE_FIELDS)
+                AkvelonUser.objects.bump_transactions_versions(batch_ids)
+
+
+"""
+    Function for generating the (user_id, date, amount) rows of the transactions, amounts are in the minor units
+"""
+def generate_transactions(rand, user_ids, options):
+    heavy_count = min(len(user_ids), max(1, round(len(user_ids) * options['heavy_users']))) \
+        if options['heavy_users'] > 0 else 0
+    heavy, light = user_ids[:heavy_count], user_ids[heavy_count:] or user_ids
+    end_date = options['end_date']
+    max_amount = options['max_amount'] * 10 ** AMOUNT_DECIMAL_PLACES
+    for _ in range(options['transactions']):
+        owners = heavy if heavy and rand.random() < options['heavy_share'] else light
+        amount = rand.randint(1, max_amount)
+        if rand.random() >= options['income_ratio']:
+            amount = -amount
+        yield (owners[rand.randrange(len(owners))],
+               end_date - datetime.timedelta(days=rand.randrange(options['days'])),
+               amount)
+
+
+"""
+    Read-only file of the CSV lines of the rows for COPY FROM STDIN, the lines are produced by read() calls,
+    so the whole data is never kept in the memory
+"""
+class CSVStream:
+    def __init__(self, rows):
+        self.rows = rows
+        self.writer = csv.writer(Echo(), lineterminator='\n')
+        self.buffer = ''
+
+    def read(self, size=-1):
+        lines = [self.buffer]
+        length = len(self.buffer)
+        while size < 0 or length < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            line = self.writer.writerow(row)
+            lines.append(line)
+            length += len(line)
+        data = ''.join(lines)
+        if size < 0:
+            size = len(data)
+        self.buffer = data[size:]
+        return data[:size]
@@ -0,0 +1,337 @@
+import asyncio
+import bisect
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+from .cache import auth_cache_stats, user_cache_stats
+from .hashing import hashing_stats
+
+"""
+    Per-request performance metrics. Every request gets its latency and response size recorded in the per-route
+    histograms, REQUEST_METRICS_SAMPLE_RATE of the requests are also instrumented: the SQL queries are timed by
+    the execute wrapper of every connection, which finds the metrics of the request by the context variable, so
+    the queries of the sync views run by the ASGI handler in the other thread are timed too. The serializer time
+    is measured by the views (see measure_serializer()) and reported only for the requests which measured it.
+    The sampled requests get the Server-Timing header, and the slow ones are logged with their slowest SQL
+    statements. The metrics are process local, like the cache and hashing stats, and are exposed in the Prometheus
+    text format by /api/metrics/
+"""
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+# Number of the slowest SQL statements kept by the sampled request for the slow request log
+SLOW_QUERIES_KEPT = 5
+# Methods recorded by their names, the others are recorded as "other", so the labels are bounded
+RECORDED_METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+
+_current_metrics = ContextVar('request_metrics', default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            yield bound, total
+
+
+"""
+    Statistics of the requests of one route and method
+"""
+class RouteStats:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.response_size = Histogram(SIZE_BUCKETS)
+        self.sampled = 0
+        self.queries = 0
+        self.sql_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_measured = 0
+        self.slow = 0
+
+
+class RequestMetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes = {}
+
+    def record(self, route, method, metrics, duration, size):
+        with self._lock:
+            stats = self.routes.get((route, method))
+            if stats is None:
+                stats = self.routes[(route, method)] = RouteStats()
+            stats.latency.observe(duration)
+            if size is not None:
+                stats.response_size.observe(size)
+            if metrics is not None:
+                stats.sampled += 1
+                stats.queries += metrics.queries
+                stats.sql_time += metrics.sql_time
+                if metrics.serializer_time is not None:
+                    stats.serializer_measured += 1
+                    stats.serializer_time += metrics.serializer_time
+            if duration >= settings.REQUEST_METRICS_SLOW_THRESHOLD:
+                stats.slow += 1
+
+    def snapshot(self):
+        with self._lock:
+            return sorted(self.routes.items())
+
+
+request_metrics = RequestMetricsRegistry()
+
+
+"""
+    Measurements of the sampled request. The SQL statements are kept without the parameters, the serializer
+    time is None if the view did not measure it
+"""
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.serializer_time = None
+        self.slowest = []
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            with self._lock:
+                self.queries += 1
+                self.sql_time += duration
+                if len(self.slowest) < SLOW_QUERIES_KEPT:
+                    bisect.insort(self.slowest, (-duration, sql))
+                elif -duration < self.slowest[-1][0]:
+                    self.slowest.pop()
+                    bisect.insort(self.slowest, (-duration, sql))
+
+    """
+        Context manager for timing the SQL queries of the current context, the context is copied to the threads
+        of sync_to_async(), the async views (see api/async_views.py) run the view in their own pool thread,
+        so they instrument it there
+    """
+    @contextmanager
+    def instrument(self):
+        token = _current_metrics.set(self)
+        try:
+            yield
+        finally:
+            _current_metrics.reset(token)
+
+    def server_timing(self, duration):
+        serializer_time = self.serializer_time or 0.0
+        app_time = max(duration - self.sql_time - serializer_time, 0.0)
+        timings = [f'db;dur={self.sql_time * 1000:.1f};desc="{self.queries} queries"']
+        if self.serializer_time is not None:
+            timings.append(f'serializer;dur={serializer_time * 1000:.1f}')
+        timings.append(f'app;dur={app_time * 1000:.1f}')
+        timings.append(f'total;dur={duration * 1000:.1f}')
+        return ', '.join(timings)
+
+
+def _execute(execute, sql, params, many, context):
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+"""
+    Receiver of the connection_created signal (see api/apps.py), which adds the execute wrapper once
+    to every database connection
+"""
+def install_execute_wrapper(connection, **kwargs):
+    if _execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute)
+
+
+def get_request_metrics(request):
+    return getattr(request, 'metrics', None)
+
+
+"""
+    Context manager for measuring the serializer time of the sampled request, the SQL queries run by
+    the serializer (e.g. by the lazy querysets) are not counted
+"""
+@contextmanager
+def measure_serializer(request):
+    metrics = get_request_metrics(request)
+    if metrics is None:
+        yield
+        return
+    sql_time = metrics.sql_time
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializer_time = ((metrics.serializer_time or 0.0)
+                                   + max(time.perf_counter() - started - (metrics.sql_time - sql_time), 0.0))
+
+
+"""
+    Middleware recording the request metrics, it should be the first one, so the time of the other middlewares
+    is included. It is both sync and async capable, so the ASGI profile keeps the async middleware chain
+"""
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(self.get_response):
+            # Marks the instance as the coroutine function for Django, as MiddlewareMixin does
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not settings.REQUEST_METRICS:
+            return self.get_response(request)
+
+        metrics = self.start(request)
+        started = time.perf_counter()
+        if metrics is None:
+            response = self.get_response(request)
+        else:
+            with metrics.instrument():
+                response = self.get_response(request)
+        return self.finish(request, response, metrics, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        if not settings.REQUEST_METRICS:
+            return await self.get_response(request)
+
+        metrics = self.start(request)
+        started = time.perf_counter()
+        if metrics is None:
+            response = await self.get_response(request)
+        else:
+            with metrics.instrument():
+                response = await self.get_response(request)
+        return self.finish(request, response, metrics, time.perf_counter() - started)
+
+    def start(self, request):
+        if random.random() < settings.REQUEST_METRICS_SAMPLE_RATE:
+            request.metrics = RequestMetrics()
+            return request.metrics
+        return None
+
+    def finish(self, request, response, metrics, duration):
+        match = request.resolver_match
+        route = match.view_name if match is not None else 'unmatched'
+        method = request.method if request.method in RECORDED_METHODS else 'other'
+        size = None if response.streaming else len(response.content)
+        request_metrics.record(route, method, metrics, duration, size)
+
+        if metrics is not None:
+            response['Server-Timing'] = metrics.server_timing(duration)
+        if duration >= settings.REQUEST_METRICS_SLOW_THRESHOLD:
+            log_slow_request(request, response, route, duration, metrics)
+        return response
+
+
+def log_slow_request(request, response, route, duration, metrics):
+    if metrics is None:
+        logger.warning('Slow request %s %s (%s): %d in %.3f s, not sampled', request.method, request.path, route,
+                       response.status_code, duration)
+        return
+    statements = ''.join(f'\n  {-negative * 1000:.1f} ms: {sql}' for negative, sql in metrics.slowest)
+    serializer = 'not measured' if metrics.serializer_time is None else f'{metrics.serializer_time:.3f} s'
+    logger.warning('Slow request %s %s (%s): %d in %.3f s, %d queries in %.3f s, serializer %s, '
+                   'slowest queries:%s', request.method, request.path, route, response.status_code, duration,
+                   metrics.queries, metrics.sql_time, serializer, statements)
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _histogram_lines(name, histogram, labels):
+    for bound, count in histogram.cumulative():
+        yield f'{name}_bucket{_labels(**labels, le=bound)} {count}'
+    yield f'{name}_sum{_labels(**labels)} {histogram.sum}'
+    yield f'{name}_count{_labels(**labels)} {histogram.count}'
+
+
+"""
+    Function for rendering the request metrics, the caches and the password hashing pool stats
+    in the Prometheus text exposition format
+"""
+def render_prometheus():
+    lines = []
+
+    def family(name, kind, help_text):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+
+    routes = request_metrics.snapshot()
+    family('api_request_duration_seconds', 'histogram', 'Request latency')
+    for (route, method), stats in routes:
+        lines.extend(_histogram_lines('api_request_duration_seconds', stats.latency, {'route': route, 'method': method}))
+    family('api_response_size_bytes', 'histogram', 'Size of the non-streaming responses')
+    for (route, method), stats in routes:
+        lines.extend(_histogram_lines('api_response_size_bytes', stats.response_size,
+                                      {'route': route, 'method': method}))
+    counters = [
+        ('api_sampled_requests_total', 'Instrumented requests', 'sampled'),
+        ('api_db_queries_total', 'SQL queries of the sampled requests', 'queries'),
+        ('api_db_duration_seconds_total', 'SQL time of the sampled requests', 'sql_time'),
+        ('api_serializer_measured_requests_total', 'Sampled requests which measured the serializer time',
+         'serializer_measured'),
+        ('api_serializer_duration_seconds_total', 'Serializer time of the sampled requests which measured it',
+         'serializer_time'),
+        ('api_slow_requests_total', 'Requests slower than REQUEST_METRICS_SLOW_THRESHOLD', 'slow'),
+    ]
+    for name, help_text, attribute in counters:
+        family(name, 'counter', help_text)
+        for (route, method), stats in routes:
+            # The serializer time is not reported for the routes which never measure it
+            if attribute.startswith('serializer') and not stats.serializer_measured:
+                continue
+            lines.append(f'{name}{_labels(route=route, method=method)} {getattr(stats, attribute)}')
+
+    caches = [('users', user_cache_stats), ('auth_users', auth_cache_stats)]
+    family('api_cache_hits_total', 'counter', 'Users cache hits')
+    lines.extend(f'api_cache_hits_total{_labels(cache=name)} {stats.hits}' for name, stats in caches)
+    family('api_cache_misses_total', 'counter', 'Users cache misses')
+    lines.extend(f'api_cache_misses_total{_labels(cache=name)} {stats.misses}' for name, stats in caches)
+
+    hashing = hashing_stats.as_dict()
+    for key, kind in (('submitted', 'counter'), ('completed', 'counter'), ('rejected', 'counter'),
+                      ('timed_out', 'counter'), ('pending', 'gauge'), ('max_pending', 'gauge'),
+                      ('workers', 'gauge'), ('queue_depth', 'gauge')):
+        name = f'api_password_hashing_{key}' + ('_total' if kind == 'counter' else '')
+        family(name, kind, f'Password hashing pool {key.replace("_", " ")}')
+        lines.append(f'{name} {hashing[key]}')
+    for key in ('utilisation', 'avg_wait_time', 'max_wait_time'):
+        if hashing[key] is not None:
+            name = f'api_password_hashing_{key}' + ('_seconds' if key.endswith('wait_time') else '')
+            family(name, 'gauge', f'Password hashing pool {key.replace("_", " ")}')
+            lines.append(f'{name} {hashing[key]}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,54 @@
+# Generated by Django 3.2.3 on 2026-10-17 02:23
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def build_daily_summaries(apps, schema_editor):
+    Transaction = apps.get_model('api', 'Transaction')
+    TransactionDailySummary = apps.get_model('api', 'TransactionDailySummary')
+    rows = Transaction.objects.order_by().values('user_id', 'date').annotate(
+        summary_income_sum=Coalesce(models.Sum('amount', filter=models.Q(amount__gt=0)), models.Value(0.0)),
+        summary_outcome_sum=Coalesce(models.Sum('amount', filter=models.Q(amount__lt=0)), models.Value(0.0)),
+        summary_income_count=models.Count('id', filter=models.Q(amount__gt=0)),
+        summary_outcome_count=models.Count('id', filter=models.Q(amount__lt=0)),
+    )
+    TransactionDailySummary.objects.bulk_create((
+        TransactionDailySummary(
+            user_id=row['user_id'],
+            date=row['date'],
+            income_sum=row['summary_income_sum'],
+            outcome_sum=row['summary_outcome_sum'],
+            income_count=row['summary_income_count'],
+            outcome_count=row['summary_outcome_count'],
+        ) for row in rows.iterator()
+    ), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_transaction_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('income_sum', models.FloatField(default=0)),
+                ('outcome_sum', models.FloatField(default=0)),
+                ('income_count', models.IntegerField(default=0)),
+                ('outcome_count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='transactiondailysummary',
+            constraint=models.UniqueConstraint(fields=('user', 'date'), name='transaction_daily_summary_user_date_uniq'),
+        ),
+        migrations.RunPython(build_daily_summaries, migrations.RunPython.noop),
+    ]
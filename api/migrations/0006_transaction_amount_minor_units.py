@@ -0,0 +1,55 @@
+# Generated by Django 3.2.3 on 2026-10-17 02:27
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Round
+
+# Amounts are stored in cents, see api/amounts.py
+MINOR_UNITS = 100
+
+
+def amounts_to_minor_units(apps, schema_editor):
+    Transaction = apps.get_model('api', 'Transaction')
+    TransactionDailySummary = apps.get_model('api', 'TransactionDailySummary')
+    Transaction.objects.update(amount=Round(F('amount') * MINOR_UNITS))
+    TransactionDailySummary.objects.update(
+        income_sum=Round(F('income_sum') * MINOR_UNITS),
+        outcome_sum=Round(F('outcome_sum') * MINOR_UNITS),
+    )
+
+
+def amounts_from_minor_units(apps, schema_editor):
+    Transaction = apps.get_model('api', 'Transaction')
+    TransactionDailySummary = apps.get_model('api', 'TransactionDailySummary')
+    Transaction.objects.update(amount=F('amount') / float(MINOR_UNITS))
+    TransactionDailySummary.objects.update(
+        income_sum=F('income_sum') / float(MINOR_UNITS),
+        outcome_sum=F('outcome_sum') / float(MINOR_UNITS),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_transaction_access_indexes'),
+    ]
+
+    operations = [
+        # Float amounts are converted while the columns are still float, after that the cast to bigint is exact
+        migrations.RunPython(amounts_to_minor_units, amounts_from_minor_units),
+        migrations.AlterField(
+            model_name='transaction',
+            name='amount',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='transactiondailysummary',
+            name='income_sum',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='transactiondailysummary',
+            name='outcome_sum',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 3.2.3 on 2026-10-17 02:27
+
+from django.db import migrations, models
+from django.db.models import Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def calculate_balances(apps, schema_editor):
+    AkvelonUser = apps.get_model('api', 'AkvelonUser')
+    Transaction = apps.get_model('api', 'Transaction')
+    totals = Transaction.objects.order_by().values('user_id').annotate(
+        income=Coalesce(Sum('amount', filter=Q(amount__gt=0)), Value(0)),
+        outcome=Coalesce(Sum('amount', filter=Q(amount__lt=0)), Value(0)),
+    )
+    for row in totals.iterator():
+        AkvelonUser.objects.filter(pk=row['user_id']).update(
+            balance=row['income'] + row['outcome'],
+            income_total=row['income'],
+            outcome_total=row['outcome'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_transaction_amount_minor_units'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='akvelonuser',
+            name='balance',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='akvelonuser',
+            name='income_total',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='akvelonuser',
+            name='outcome_total',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(calculate_balances, migrations.RunPython.noop),
+    ]
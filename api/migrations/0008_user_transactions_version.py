@@ -0,0 +1,18 @@
+# Generated by Django 3.2.3 on 2026-10-17 02:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_user_balance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='akvelonuser',
+            name='transactions_version',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 3.2.3 on 2026-10-17 02:35
+
+from django.db import migrations, models
+
+# Trigram indexes for the icontains search of the users list, the indexed expression is the same
+# UPPER("column"::text) which Django generates for the icontains lookup on PostgreSQL
+SEARCH_FIELDS = ('email', 'first_name', 'last_name')
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    AkvelonUser = apps.get_model('api', 'AkvelonUser')
+    quote_name = schema_editor.quote_name
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {quote_name(f"user_{field}_trgm_idx")} '
+            f'ON {quote_name(AkvelonUser._meta.db_table)} '
+            f'USING gin (UPPER({quote_name(field)}::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(f"user_{field}_trgm_idx")}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_user_transactions_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='akvelonuser',
+            index=models.Index(fields=['last_name', 'first_name', 'id'], name='user_last_first_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='akvelonuser',
+            index=models.Index(fields=['first_name', 'last_name', 'id'], name='user_first_last_name_idx'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
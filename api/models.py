@@ -1,5 +1,7 @@
 from django.contrib.auth.base_user import BaseUserManager, AbstractBaseUser
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
 
 """
     Extended class of the BaseUserManager for manipulating with the AkvelonUser model 
@@ -52,6 +54,38 @@ class AkvelonUserManager(BaseUserManager):
         user.save(using=self._db)
         return user
 
+    """
+        Method for applying the balance deltas {user_id: (income, outcome)} with F() expressions, so
+        concurrent updates of the same user are never lost. The transactions version of every user
+        in the deltas is incremented, even if the balance itself is not changed
+    """
+    def apply_balance_deltas(self, deltas):
+        for user_id, (income, outcome) in sorted(deltas.items()):
+            self.filter(pk=user_id).update(
+                balance=F('balance') + income + outcome,
+                income_total=F('income_total') + income,
+                outcome_total=F('outcome_total') + outcome,
+                transactions_version=F('transactions_version') + 1,
+            )
+
+    """
+        Method for incrementing the transactions version of the users with the given ids (of all users if
+        the ids are not given), it is called by the commands which rewrite the summaries or balances directly,
+        so the ETags of the changed responses are changed too
+    """
+    def bump_transactions_versions(self, user_ids=None):
+        users = self.all() if user_ids is None else self.filter(pk__in=user_ids)
+        users.update(transactions_version=F('transactions_version') + 1)
+
+    """
+        Method for calculating the (user_id, income, outcome) totals of the transactions in the database
+    """
+    def calculate_balances(self, transactions):
+        return transactions.order_by().values('user_id').annotate(
+            income=Coalesce(Sum('amount', filter=Q(amount__gt=0)), Value(0)),
+            outcome=Coalesce(Sum('amount', filter=Q(amount__lt=0)), Value(0)),
+        ).values_list('user_id', 'income', 'outcome').iterator()
+
 
 """
     Extended class of the AbstractBaseUser which uses only important for us fields
@@ -66,11 +100,40 @@ class AkvelonUser(AbstractBaseUser):
     is_superuser = models.BooleanField(default=False)
     first_name = models.CharField(max_length=60)
     last_name = models.CharField(max_length=60)
+    # Denormalized totals of the user transactions in the minor units (cents), they are changed only
+    # by AkvelonUserManager.apply_balance_deltas() and can be checked by the check_balances command
+    balance = models.BigIntegerField(default=0)
+    income_total = models.BigIntegerField(default=0)
+    outcome_total = models.BigIntegerField(default=0)
+    # Version of the user transactions which is incremented on every transaction write, used for the ETags
+    transactions_version = models.BigIntegerField(default=0)
 
     objects = AkvelonUserManager()
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name']
+    BALANCE_FIELDS = ('balance', 'income_total', 'outcome_total')
+    COUNTER_FIELDS = BALANCE_FIELDS + ('transactions_version',)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination indexes of the users list sorted by the names (see UsersPagination), the search
+            # by the names and email uses the trigram indexes created by the 0009 migration on PostgreSQL
+            models.Index(fields=['last_name', 'first_name', 'id'], name='user_last_first_name_idx'),
+            models.Index(fields=['first_name', 'last_name', 'id'], name='user_first_last_name_idx'),
+        ]
+
+    """
+        Overridden save() method which never writes the counter fields of the existing user, so the
+        stale values loaded with the instance do not overwrite concurrent counter updates
+    """
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super(AkvelonUser, self).save(*args, **kwargs)
 
     def get_full_name(self):
         return self.first_name + ' ' + self.last_name
@@ -88,7 +151,169 @@ class AkvelonUser(AbstractBaseUser):
         return True
 
 
+"""
+    QuerySet of the transactions which removes the deleted transactions from the daily summaries and balances
+    by one aggregate query. There are no delete signals on Transaction, so Django keeps the fast delete, e.g.
+    for the cascade delete of the user, whose summaries are deleted by the cascade as well
+"""
+class TransactionQuerySet(models.QuerySet):
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            deltas = {}
+            for summary in TransactionDailySummary.objects.calculate(self):
+                deltas[(summary.user_id, summary.date)] = (-summary.income_sum, -summary.outcome_sum,
+                                                           -summary.income_count, -summary.outcome_count)
+            apply_transaction_deltas(deltas)
+            return super(TransactionQuerySet, self).delete()
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
 class Transaction(models.Model):
-    user = models.ForeignKey(AkvelonUser, on_delete=models.CASCADE, related_name='transactions', null=False, blank=False)
+    # The user column is the leading column of the (user, date) indexes, so the separate FK index is not needed
+    user = models.ForeignKey(AkvelonUser, on_delete=models.CASCADE, related_name='transactions', null=False, blank=False,
+                             db_index=False)
     date = models.DateField(auto_now_add=True, null=False, blank=True)
-    amount = models.FloatField(null=False, blank=False)
+    # Amount in the minor units (cents), see api/amounts.py
+    amount = models.BigIntegerField(null=False, blank=False)
+
+    objects = TransactionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination indexes for the (date, id) and (amount, id) cursors
+            models.Index(fields=['date', 'id'], name='transaction_date_id_idx'),
+            models.Index(fields=['amount', 'id'], name='transaction_amount_id_idx'),
+            # Per user transactions filtered by the date range
+            models.Index(fields=['user', 'date'], name='transaction_user_date_idx'),
+            # Per user income / outcome transactions filtered by the date range. Amount is included
+            # into the index (PostgreSQL only) for the index-only scans of the sums
+            models.Index(fields=['user', 'date'], include=['amount'], condition=Q(amount__gt=0),
+                         name='transaction_income_idx'),
+            models.Index(fields=['user', 'date'], include=['amount'], condition=Q(amount__lt=0),
+                         name='transaction_outcome_idx'),
+        ]
+
+    """
+        Overridden from_db() method for remembering the stored values, which are used to revert
+        the previous state of the transaction in the daily summaries on update
+    """
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(Transaction, cls).from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    """
+        Overridden save() method for updating the transaction, its daily summary and the balance of the user
+        (see api/signals.py) in the same database transaction
+    """
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            super(Transaction, self).save(*args, **kwargs)
+
+    """
+        Overridden delete() method for removing the transaction from its daily summary and the balance
+        of the user in the same database transaction
+    """
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            apply_transaction_deltas(TransactionDailySummary.objects.collect_deltas([self], sign=-1))
+            return super(Transaction, self).delete(*args, **kwargs)
+
+
+"""
+    Manager of the daily summaries which applies the changes of the transactions to the summary rows
+"""
+class TransactionDailySummaryManager(models.Manager):
+    """
+        Method for applying many summary deltas at once, deltas are the dictionary
+        {(user_id, date): (income_sum, outcome_sum, income_count, outcome_count)}
+    """
+    def apply_many(self, deltas):
+        for (user_id, date), (income_sum, outcome_sum, income_count, outcome_count) in sorted(deltas.items()):
+            if not (income_sum or outcome_sum or income_count or outcome_count):
+                continue
+            # The summary row is created only when something is added to it, so removing transactions
+            # of the user which is being deleted never resurrects the summary
+            if income_count > 0 or outcome_count > 0:
+                self.get_or_create(user_id=user_id, date=date)
+            self.filter(user_id=user_id, date=date).update(
+                income_sum=F('income_sum') + income_sum,
+                outcome_sum=F('outcome_sum') + outcome_sum,
+                income_count=F('income_count') + income_count,
+                outcome_count=F('outcome_count') + outcome_count,
+            )
+
+    """
+        Method for collecting summary deltas of the transactions, which can be applied by apply_many()
+    """
+    def collect_deltas(self, transactions, sign=1, deltas=None):
+        deltas = {} if deltas is None else deltas
+        for item in transactions:
+            key = (item.user_id, item.date)
+            delta = _summary_delta(item.amount, sign)
+            deltas[key] = tuple(map(sum, zip(deltas.get(key, (0, 0, 0, 0)), delta)))
+        return deltas
+
+    """
+        Method for calculating the daily summaries from the raw transactions, returns not saved instances
+    """
+    def calculate(self, transactions):
+        rows = transactions.order_by().values('user_id', 'date').annotate(
+            summary_income_sum=Coalesce(Sum('amount', filter=Q(amount__gt=0)), Value(0)),
+            summary_outcome_sum=Coalesce(Sum('amount', filter=Q(amount__lt=0)), Value(0)),
+            summary_income_count=Count('id', filter=Q(amount__gt=0)),
+            summary_outcome_count=Count('id', filter=Q(amount__lt=0)),
+        )
+        for row in rows.iterator():
+            yield self.model(
+                user_id=row['user_id'],
+                date=row['date'],
+                income_sum=row['summary_income_sum'],
+                outcome_sum=row['summary_outcome_sum'],
+                income_count=row['summary_income_count'],
+                outcome_count=row['summary_outcome_count'],
+            )
+
+
+"""
+    Rollup of the user transactions for one day. Rows are maintained incrementally on every
+    transaction create, update or delete and can be rebuilt by the rebuild_transaction_summaries command
+"""
+class TransactionDailySummary(models.Model):
+    user = models.ForeignKey(AkvelonUser, on_delete=models.CASCADE, related_name='daily_summaries')
+    date = models.DateField()
+    income_sum = models.BigIntegerField(default=0)
+    outcome_sum = models.BigIntegerField(default=0)
+    income_count = models.IntegerField(default=0)
+    outcome_count = models.IntegerField(default=0)
+
+    objects = TransactionDailySummaryManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='transaction_daily_summary_user_date_uniq'),
+        ]
+
+
+"""
+    Function for applying the deltas collected by TransactionDailySummaryManager.collect_deltas()
+    to the daily summaries and to the balances of the users
+"""
+def apply_transaction_deltas(deltas):
+    TransactionDailySummary.objects.apply_many(deltas)
+    balances = {}
+    for (user_id, date), (income_sum, outcome_sum, income_count, outcome_count) in deltas.items():
+        income, outcome = balances.get(user_id, (0, 0))
+        balances[user_id] = (income + income_sum, outcome + outcome_sum)
+    AkvelonUser.objects.apply_balance_deltas(balances)
+
+
+def _summary_delta(amount, sign):
+    if amount > 0:
+        return sign * amount, 0, sign, 0
+    if amount < 0:
+        return 0, sign * amount, 0, sign
+    return 0, 0, 0, 0
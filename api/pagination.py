@@ -0,0 +1,191 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import namedtuple
+from types import SimpleNamespace
+
+from django.db.models import BooleanField, F, Func, Q, Value
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+KeysetCursor = namedtuple('KeysetCursor', ['reverse', 'position'])
+
+"""
+    Keyset (seek) pagination. Unlike the DRF CursorPagination, which stores only the first
+    ordering field and an offset inside the cursor, the cursor here is the full position of
+    the boundary row over all ordering fields plus the primary key. Every page is therefore
+    fetched with a single range condition on an index and costs the same regardless of depth.
+"""
+class KeysetPagination(CursorPagination):
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering_param = api_settings.ORDERING_PARAM
+    # Fields which can be used as the leading keyset columns, the primary key is always appended
+    ordering_fields = ()
+    default_ordering = ()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.fields = [queryset.model._meta.get_field(order.lstrip('-')) for order in self.ordering]
+
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            queryset = queryset.filter(self.get_seek_condition(ordering, self.cursor.position))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    """
+        Method for building the condition (a, b, id) > (x, y, z) taking into account the
+        direction of every ordering field. When all fields have the same direction it is the row
+        comparison, which the database runs as one range scan of the composite index, mixed directions
+        are expanded into a > x OR (a = x AND b > y) OR ...
+    """
+    def get_seek_condition(self, ordering, position):
+        descending = {order.startswith('-') for order in ordering}
+        if len(descending) == 1:
+            return RowComparison([order.lstrip('-') for order in ordering], position, self.fields,
+                                 '<' if descending.pop() else '>')
+        condition = Q()
+        equal = {}
+        for order, value in zip(ordering, position):
+            attr = order.lstrip('-')
+            lookup = '__lt' if order.startswith('-') else '__gt'
+            condition |= Q(**equal, **{attr + lookup: value})
+            equal[attr] = value
+        return condition
+
+    def get_ordering(self, request, queryset, view):
+        params = request.query_params.get(self.ordering_param)
+        ordering = []
+        if params:
+            for term in params.split(','):
+                term = term.strip()
+                if term.lstrip('-') in self.ordering_fields and term.lstrip('-') not in _ordering_attrs(ordering):
+                    ordering.append(term)
+        if not ordering:
+            ordering = list(self.default_ordering)
+        # The primary key is the tie breaker which makes the position unique
+        pk_name = queryset.model._meta.pk.name
+        pk_order = '-' + pk_name if ordering and ordering[-1].startswith('-') else pk_name
+        return tuple(ordering) + (pk_order,)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(KeysetCursor(reverse=False, position=self._get_position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(KeysetCursor(reverse=True, position=self._get_position(self.page[0])))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            tokens = json.loads(urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            reverse = bool(tokens.get('r', False))
+            values = tokens['p']
+            if len(values) != len(self.fields):
+                raise ValueError
+            position = [field.to_python(value) for field, value in zip(self.fields, values)]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+        return KeysetCursor(reverse=reverse, position=position)
+
+    def encode_cursor(self, cursor):
+        tokens = {'p': cursor.position}
+        if cursor.reverse:
+            tokens['r'] = 1
+        encoded = urlsafe_b64encode(json.dumps(tokens, separators=(',', ':')).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _get_position(self, instance):
+        # Rows selected with .values() are encoded the same way as the model instances
+        if isinstance(instance, dict):
+            instance = SimpleNamespace(**instance)
+        return [field.value_to_string(instance) for field in self.fields]
+
+
+"""
+    Row value comparison (a, b, id) > (x, y, z) usable in filter(), the values are converted by the model fields
+"""
+class RowComparison(Func):
+    output_field = BooleanField()
+    conditional = True
+
+    def __init__(self, attrs, values, fields, operator):
+        self.operator = operator
+        expressions = [F(attr) for attr in attrs]
+        expressions += [Value(value, output_field=field) for value, field in zip(values, fields)]
+        super(RowComparison, self).__init__(*expressions)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sqls = []
+        params = []
+        for expression in self.source_expressions:
+            sql, expression_params = compiler.compile(expression)
+            sqls.append(sql)
+            params.extend(expression_params)
+        size = len(sqls) // 2
+        return f'({", ".join(sqls[:size])}) {self.operator} ({", ".join(sqls[size:])})', params
+
+
+class TransactionsPagination(KeysetPagination):
+    ordering_fields = ('date', 'amount')
+    default_ordering = ('date',)
+
+
+"""
+    Pagination of the users list, sorting by one name is completed by the other one in the same direction,
+    so every sort option matches one of the (last_name, first_name, id) and (first_name, last_name, id) indexes
+"""
+class UsersPagination(KeysetPagination):
+    ordering_fields = ('first_name', 'last_name')
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super(UsersPagination, self).get_ordering(request, queryset, view))
+        pk_order = ordering.pop()
+        if ordering:
+            prefix = '-' if ordering[-1].startswith('-') else ''
+            for field in self.ordering_fields:
+                if field not in _ordering_attrs(ordering):
+                    ordering.append(prefix + field)
+        return tuple(ordering) + (pk_order,)
+
+
+def _ordering_attrs(ordering):
+    return [order.lstrip('-') for order in ordering]
+
+
+def _reverse_ordering(ordering):
+    return tuple(order[1:] if order.startswith('-') else '-' + order for order in ordering)
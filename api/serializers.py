@@ -1,8 +1,35 @@
-from django.contrib.auth.hashers import make_password
-from rest_framework import serializers
 from django.db.models import Sum
+from django.db.models.functions import TruncMonth, TruncWeek, TruncYear
+from rest_framework import serializers
+
+from .hashing import hash_password
+from .amounts import AMOUNT_DECIMAL_PLACES, AMOUNT_MAX_DIGITS, from_minor_units, to_minor_units
+from .models import AkvelonUser, Transaction, TransactionDailySummary
+
+SUMMARY_GRANULARITIES = {
+    'day': None,
+    'week': TruncWeek,
+    'month': TruncMonth,
+    'year': TruncYear,
+}
 
-from .models import AkvelonUser, Transaction
+
+"""
+    Serializer field of the transaction amount, which accepts and returns decimal amounts
+    and stores them as the integer number of the minor units (see api/amounts.py)
+"""
+class AmountField(serializers.DecimalField):
+    def __init__(self, **kwargs):
+        kwargs.setdefault('max_digits', AMOUNT_MAX_DIGITS)
+        kwargs.setdefault('decimal_places', AMOUNT_DECIMAL_PLACES)
+        kwargs.setdefault('coerce_to_string', False)
+        super(AmountField, self).__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        return to_minor_units(super(AmountField, self).to_internal_value(data))
+
+    def to_representation(self, value):
+        return super(AmountField, self).to_representation(from_minor_units(value))
 
 """
     Serializer of the AkvelonUser model which are using to create or update AkvelonUser model
@@ -18,14 +45,20 @@ class UserSerializer(serializers.ModelSerializer):
             'is_active',
             'is_staff',
             'is_superuser',
+            'balance',
+            'income_total',
+            'outcome_total',
+            'transactions_version',
         )
-        fields = '__all__'
+        # The balances are returned only by the balance endpoint as the decimal amounts
+        exclude = AkvelonUser.COUNTER_FIELDS
 
     """
-        Overridden create method to provide hash of the input password instead of its raw value
+        Overridden create method to provide hash of the input password instead of its raw value,
+        the password is hashed in the hashing pool (see api/hashing.py)
     """
     def create(self, validated_data):
-        validated_data['password'] = make_password(validated_data['password'])
+        validated_data['password'] = hash_password(validated_data['password'])
         return super(UserSerializer, self).create(validated_data)
 
     """
@@ -33,10 +66,32 @@ class UserSerializer(serializers.ModelSerializer):
     """
     def update(self, instance, validated_data):
         if 'password' in validated_data:
-            validated_data['password'] = make_password(validated_data['password'])
+            validated_data['password'] = hash_password(validated_data['password'])
         return super(UserSerializer, self).update(instance, validated_data)
 
 
+"""
+    Serializer of one row of the users import (see api/bulk.py). Unlike UserSerializer it does not check
+    the email uniqueness by the query per row, the emails are checked for the whole import at once
+"""
+class UserImportRowSerializer(serializers.Serializer):
+    email = serializers.EmailField(max_length=60)
+    password = serializers.CharField(max_length=128, trim_whitespace=False)
+    first_name = serializers.CharField(max_length=60)
+    last_name = serializers.CharField(max_length=60)
+
+    def to_internal_value(self, data):
+        if not isinstance(data, dict):
+            raise serializers.ValidationError({'non_field_errors': ['Expected an object']})
+        for field in data:
+            if field in UserSerializer.Meta.read_only_fields:
+                raise serializers.ValidationError({'error': 'Read only field included'})
+        return super(UserImportRowSerializer, self).to_internal_value(data)
+
+    def validate_email(self, value):
+        return AkvelonUser.objects.normalize_email(value)
+
+
 class UserGetSerializer(serializers.ModelSerializer):
     class Meta:
         model = AkvelonUser
@@ -54,7 +109,27 @@ class UserGetSerializer(serializers.ModelSerializer):
         )
 
 
+"""
+    Serializer of the stored balance and totals of the user transactions
+"""
+class UserBalanceSerializer(serializers.ModelSerializer):
+    balance = AmountField(read_only=True)
+    income_total = AmountField(read_only=True)
+    outcome_total = AmountField(read_only=True)
+
+    class Meta:
+        model = AkvelonUser
+        fields = (
+            'id',
+            'balance',
+            'income_total',
+            'outcome_total',
+        )
+
+
 class TransactionCreateSerializer(serializers.ModelSerializer):
+    amount = AmountField()
+
     class Meta:
         model = Transaction
         read_only_fields = (
@@ -71,6 +146,7 @@ class TransactionCreateSerializer(serializers.ModelSerializer):
 
 class TransactionSerializer(serializers.ModelSerializer):
     user = UserGetSerializer()
+    amount = AmountField()
 
     class Meta:
         model = Transaction
@@ -86,7 +162,61 @@ class TransactionSerializer(serializers.ModelSerializer):
         )
 
 
+"""
+    Flat representation of the transaction with the user id only, which does not require the join
+    with the user table
+"""
+class TransactionFlatSerializer(serializers.ModelSerializer):
+    amount = AmountField()
+
+    class Meta:
+        model = Transaction
+        fields = (
+            'id',
+            'user',
+            'date',
+            'amount',
+        )
+
+
+"""
+    Serializer of one row of the bulk transactions payload. The user is given by the id or email and
+    resolved from the 'users' dictionary in the context (see api/bulk.py) instead of the database
+"""
+class TransactionBulkRowSerializer(serializers.Serializer):
+    user = serializers.JSONField()
+    amount = AmountField()
+
+    class Meta:
+        read_only_fields = (
+            'id',
+            'date'
+        )
+
+    def to_internal_value(self, data):
+        if not isinstance(data, dict):
+            raise serializers.ValidationError({'non_field_errors': ['Expected an object']})
+        for field in data:
+            if field in self.Meta.read_only_fields:
+                raise serializers.ValidationError({'error': 'Read only field included'})
+        return super(TransactionBulkRowSerializer, self).to_internal_value(data)
+
+    def validate_user(self, value):
+        # The booleans and floats equal to the integer ids would be found in the dictionary
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            raise serializers.ValidationError('User must be an id or an email')
+        try:
+            return self.context['users'][value]
+        except KeyError:
+            raise serializers.ValidationError('User not found')
+
+    def validate(self, attrs):
+        return {'user_id': attrs['user'], 'amount': attrs['amount']}
+
+
 class TransactionsListSerializer(serializers.ModelSerializer):
+    amount = AmountField()
+
     class Meta:
         model = Transaction
         read_only_fields = (
@@ -114,14 +244,24 @@ class UserTransactionsSerializer(serializers.ModelSerializer):
         )
 
 
+"""
+    Serializer of the query parameters of the summary endpoints
+"""
+class TransactionsSummaryQuerySerializer(serializers.Serializer):
+    from_date = serializers.DateField(required=False)
+    to_date = serializers.DateField(required=False)
+    granularity = serializers.ChoiceField(choices=list(SUMMARY_GRANULARITIES), default='day')
+
+
 class UserIncomeTransactionsSummarySerializer(serializers.ModelSerializer):
     transactions_summary = serializers.SerializerMethodField('get_transactions_summary')
 
     """
-        Serializer method for calculating the sum of the transactions grouped by date
+        Serializer method for getting the sum of the transactions grouped by the date bucket from the daily summaries
     """
     def get_transactions_summary(self, user):
-        return Transaction.objects.filter(user=user, amount__gt=0).values('date').annotate(sum=Sum('amount'))
+        summaries = TransactionDailySummary.objects.filter(user=user, income_count__gt=0)
+        return _get_transactions_summary(summaries, 'income_sum', self.context.get('summary_query', {}))
 
     class Meta:
         model = AkvelonUser
@@ -138,10 +278,11 @@ class UserOutcomeTransactionsSummarySerializer(serializers.ModelSerializer):
     transactions_summary = serializers.SerializerMethodField('get_transactions_summary')
 
     """
-        Serializer method for calculating the sum of the transactions grouped by date
+        Serializer method for getting the sum of the transactions grouped by the date bucket from the daily summaries
     """
     def get_transactions_summary(self, user):
-        return Transaction.objects.filter(user=user, amount__lt=0).values('date').annotate(sum=Sum('amount'))
+        summaries = TransactionDailySummary.objects.filter(user=user, outcome_count__gt=0)
+        return _get_transactions_summary(summaries, 'outcome_sum', self.context.get('summary_query', {}))
 
     class Meta:
         model = AkvelonUser
@@ -153,3 +294,20 @@ class UserOutcomeTransactionsSummarySerializer(serializers.ModelSerializer):
             'transactions_summary'
         )
 
+
+"""
+    Function for grouping the daily summaries by the date buckets (day, week, month or year) in the database,
+    so the number of returned rows depends only on the number of buckets
+"""
+def _get_transactions_summary(summaries, sum_field, query):
+    if 'from_date' in query:
+        summaries = summaries.filter(date__gte=query['from_date'])
+    if 'to_date' in query:
+        summaries = summaries.filter(date__lte=query['to_date'])
+    granularity = query.get('granularity', 'day')
+    if granularity == 'day':
+        summaries = summaries.order_by('date').values_list('date', sum_field)
+    else:
+        summaries = summaries.annotate(bucket=SUMMARY_GRANULARITIES[granularity]('date')) \
+            .order_by('bucket').values('bucket').annotate(bucket_sum=Sum(sum_field)).values_list('bucket', 'bucket_sum')
+    return [{'date': date, 'sum': from_minor_units(amount)} for date, amount in summaries]
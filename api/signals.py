@@ -0,0 +1,48 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .cache import invalidate_user
+from .models import AkvelonUser, Transaction, TransactionDailySummary, apply_transaction_deltas
+
+"""
+    Signal handlers which keep the daily summaries and balances of the users in sync with the saved transactions. The handlers
+    run inside the database transaction of the save (see Transaction.save()), the deletes are handled by Transaction.delete()
+    and TransactionQuerySet.delete() without the signals, which would disable the fast delete
+"""
+
+TRACKED_FIELDS = ('user_id', 'date', 'amount')
+
+
+"""
+    Loading of the stored state of the updated transaction if it was not loaded from the database
+    with all tracked fields (see Transaction.from_db())
+"""
+@receiver(pre_save, sender=Transaction)
+def load_previous_transaction_state(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    values = getattr(instance, '_loaded_values', {})
+    if not all(field in values for field in TRACKED_FIELDS):
+        instance._loaded_values = Transaction.objects.filter(pk=instance.pk).values(*TRACKED_FIELDS).first()
+
+
+@receiver(post_save, sender=Transaction)
+def update_daily_summary_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    deltas = {}
+    previous = None if created else getattr(instance, '_loaded_values', None)
+    if previous:
+        TransactionDailySummary.objects.collect_deltas([Transaction(**previous)], sign=-1, deltas=deltas)
+    TransactionDailySummary.objects.collect_deltas([instance], deltas=deltas)
+    apply_transaction_deltas(deltas)
+    instance._loaded_values = {field: getattr(instance, field) for field in TRACKED_FIELDS}
+
+
+"""
+    Invalidation of the cached user on every change of the user
+"""
+@receiver(post_save, sender=AkvelonUser)
+@receiver(post_delete, sender=AkvelonUser)
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance)
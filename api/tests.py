@@ -1,3 +1,682 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import json
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .asgi import StreamingASGIHandler
+from .bulk import insert_users
+from .cache import (AUTH_USER_FIELDS, AUTH_USER_KEY, USER_VERSION_KEY, get_user_cache, get_user_payload_by_id,
+                    get_user_version, invalidate_user, is_user_cache_enabled)
+from .checks import check_user_cache
+from .exceptions import PasswordHashingUnavailable
+from .metrics import RequestMetricsMiddleware, request_metrics
+from .models import AkvelonUser, Transaction, TransactionDailySummary
+
+"""
+    Base class of the API tests with the authenticated admin client. The fast hasher and the inline
+    password hashing keep the tests quick
+"""
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], PASSWORD_HASHING_WORKERS=0)
+class APITestCase(TestCase):
+    def setUp(self):
+        self.admin = AkvelonUser.objects.create_superuser('admin@example.com', 'password', 'Admin', 'Admin')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+        self.user = AkvelonUser.objects.create_user('user@example.com', 'password', 'First', 'Last')
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        super(KeysetPaginationTests, self).setUp()
+        start = datetime.date(2021, 5, 1)
+        # Several transactions share the date and the amount, so the primary key breaks the ties. The date
+        # is set by update(), create() would replace it with today because of auto_now_add
+        for day, amount in [(0, 10), (1, 20), (1, 20), (1, 30), (2, 10), (2, 10), (2, 20), (3, 30), (3, 30)]:
+            transaction = Transaction.objects.create(user=self.user, amount=amount)
+            Transaction.objects.filter(pk=transaction.pk).update(date=start + datetime.timedelta(days=day))
+
+    def traverse(self, query, link):
+        ids = []
+        pages = []
+        self.dates = set()
+        url = reverse('api:all_transactions') + query
+        while url is not None:
+            data = self.client.get(url).json()
+            pages.append([row['id'] for row in data['results']])
+            ids.extend(pages[-1])
+            self.dates.update(row['date'] for row in data['results'])
+            url = data[link]
+        return ids, pages
+
+    def check_traversal(self, query, key):
+        expected = [transaction.pk for transaction in sorted(Transaction.objects.all(), key=key)]
+        forward, pages = self.traverse(query, 'next')
+        self.assertEqual(forward, expected)
+        self.assertTrue(all(len(page) == 2 for page in pages[:-1]))
+        self.assertEqual(self.dates, {'2021-05-01', '2021-05-02', '2021-05-03', '2021-05-04'})
+
+        # Going back from the last page gives the same pages in the reverse order
+        last = reverse('api:all_transactions') + query
+        while True:
+            data = self.client.get(last).json()
+            if data['next'] is None:
+                break
+            last = data['next']
+        backward = [data['previous']] if data['previous'] else []
+        pages_back = [[row['id'] for row in data['results']]]
+        while backward:
+            data = self.client.get(backward.pop()).json()
+            pages_back.insert(0, [row['id'] for row in data['results']])
+            if data['previous']:
+                backward.append(data['previous'])
+        self.assertEqual(pages_back, pages)
+
+    def test_date_ordering(self):
+        self.check_traversal('?page_size=2&user=id', lambda t: (t.date, t.pk))
+
+    def test_descending_amount_ordering(self):
+        self.check_traversal('?page_size=2&user=id&sort=-amount', lambda t: (-t.amount, -t.pk))
+
+    def test_mixed_directions(self):
+        self.check_traversal('?page_size=2&user=id&sort=date,-amount', lambda t: (t.date, -t.amount, -t.pk))
+
+
+class TransactionWritesTestCase(APITestCase):
+    def create(self, amount):
+        response = self.client.post(reverse('api:create_transaction'), {'user': self.user.pk, 'amount': amount},
+                                    format='json')
+        self.assertEqual(response.status_code, 201)
+        return Transaction.objects.get(pk=response.json()['id'])
+
+    def update(self, transaction, amount):
+        response = self.client.patch(reverse('api:update_transaction', args=[transaction.pk]), {'amount': amount},
+                                     format='json')
+        self.assertEqual(response.status_code, 200)
+
+
+class DailySummaryTests(TransactionWritesTestCase):
+    def summaries(self):
+        return list(TransactionDailySummary.objects.filter(user=self.user).order_by('date').values_list(
+            'date', 'income_sum', 'outcome_sum', 'income_count', 'outcome_count'))
+
+    def test_create(self):
+        transaction = self.create(12.5)
+        self.create(-3)
+        self.create(1)
+        self.assertEqual(self.summaries(), [(transaction.date, 1350, -300, 2, 1)])
+
+    def test_update_same_sign(self):
+        transaction = self.create(10)
+        self.update(transaction, 25)
+        self.assertEqual(self.summaries(), [(transaction.date, 2500, 0, 1, 0)])
+
+    def test_update_sign_flip(self):
+        transaction = self.create(10)
+        self.update(transaction, -4)
+        self.assertEqual(self.summaries(), [(transaction.date, 0, -400, 0, 1)])
+
+    def test_delete(self):
+        transaction = self.create(10)
+        self.create(-5)
+        response = self.client.delete(reverse('api:delete_transaction', args=[transaction.pk]))
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.summaries(), [(transaction.date, 0, -500, 0, 1)])
+
+    def test_queryset_delete(self):
+        self.create(10)
+        self.create(-5)
+        Transaction.objects.filter(user=self.user, amount__gt=0).delete()
+        self.assertEqual([summary[1:] for summary in self.summaries()], [(0, -500, 0, 1)])
+
+    def test_user_delete_keeps_fast_delete(self):
+        for amount in range(1, 21):
+            self.create(amount)
+        # The transactions and summaries of the user are deleted by the cascade queries, not row by row
+        with self.assertNumQueries(4):
+            self.user.delete()
+        self.assertFalse(Transaction.objects.exists())
+        self.assertFalse(TransactionDailySummary.objects.exists())
+
+
+class ETagTests(TransactionWritesTestCase):
+    def assertChangedByCommand(self, url, change, *command):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        change()
+        call_command(*command, stdout=StringIO(), stderr=StringIO())
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        return first, response
+
+    def test_rebuild_transaction_summaries(self):
+        self.create(10)
+        TransactionDailySummary.objects.update(income_sum=F('income_sum') + 100)
+        url = reverse('api:user_income_transactions_summary', args=[self.user.pk])
+        first, response = self.assertChangedByCommand(url, lambda: None, 'rebuild_transaction_summaries')
+        self.assertNotEqual(response.json(), first.json())
+
+    def test_check_balances_fix(self):
+        self.create(10)
+        url = reverse('api:user_balance', args=[self.user.pk])
+        first, response = self.assertChangedByCommand(
+            url, lambda: AkvelonUser.objects.filter(pk=self.user.pk).update(balance=0), 'check_balances', '--fix')
+        self.assertEqual(response.json()['balance'], 10)
+
+
+class JSONAggTests(APITestCase):
+    def setUp(self):
+        super(JSONAggTests, self).setUp()
+        # The strings escaped by the renderer: quotes, backslashes, control and line separator characters
+        self.user.first_name = 'Пётр "Q" \\'
+        self.user.last_name = 'Last\n\t\x01\u2028'
+        self.user.save()
+        start = datetime.date(2021, 5, 1)
+        for day, amount in enumerate((100, 12.5, 0.1, -3, -0.07, 123456789012.34, -9.9)):
+            response = self.client.post(reverse('api:create_transaction'), {'user': self.user.pk, 'amount': amount},
+                                        format='json')
+            Transaction.objects.filter(pk=response.json()['id']).update(date=start + datetime.timedelta(days=day))
+
+    def serializer_response(self, name, query=''):
+        with override_settings(TRANSACTIONS_JSON_AGG=False):
+            return self.client.get(reverse(name, args=[self.user.pk]) + query).content
+
+    @skipUnless(connection.vendor == 'postgresql', 'json_agg path is available only on PostgreSQL')
+    @override_settings(TRANSACTIONS_JSON_AGG_CHUNK_SIZE=2)
+    def test_byte_identical_responses(self):
+        for name in ('api:user_transactions', 'api:user_income_transactions', 'api:user_outcome_transactions'):
+            for query in ('', '?from_date=2021-05-02&to_date=2021-05-05', '?from_date=2021-06-01'):
+                response = self.client.get(reverse(name, args=[self.user.pk]) + query)
+                self.assertTrue(response.streaming)
+                self.assertEqual(b''.join(response.streaming_content), self.serializer_response(name, query))
+
+    @skipUnless(connection.vendor == 'postgresql', 'json_agg path is available only on PostgreSQL')
+    def test_large_amounts(self):
+        self.client.post(reverse('api:create_transaction'), {'user': self.user.pk, 'amount': 10 ** 13},
+                         format='json')
+        response = self.client.get(reverse('api:user_transactions', args=[self.user.pk]))
+        self.assertFalse(response.streaming)
+        self.assertEqual(response.content, self.serializer_response('api:user_transactions'))
+
+    def test_missing_user(self):
+        response = self.client.get(reverse('api:user_transactions', args=[self.user.pk + 100]))
+        self.assertEqual(response.status_code, 404)
+
+
+"""
+    Function for sending the GET request through the ASGI handler, returns the response start message and the body
+"""
+def asgi_get(user, path, query_string=b''):
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'query_string': query_string, 'root_path': '', 'server': ('testserver', 80),
+        'headers': [(b'host', b'testserver'),
+                    (b'authorization', b'Bearer %s' % str(AccessToken.for_user(user)).encode())],
+    }
+
+    async def communicate():
+        communicator = ApplicationCommunicator(StreamingASGIHandler(), scope)
+        await communicator.send_input({'type': 'http.request', 'body': b''})
+        start = await communicator.receive_output(10)
+        body = b''
+        while True:
+            message = await communicator.receive_output(10)
+            body += message.get('body', b'')
+            if not message.get('more_body', False):
+                return start, body
+
+    return async_to_sync(communicate)()
+
+
+class ExportTests(APITestCase):
+    def setUp(self):
+        super(ExportTests, self).setUp()
+        # The dates are set by update(), create() would replace them with today because of auto_now_add
+        for amount in range(1, 31):
+            transaction = Transaction.objects.create(user=self.user, amount=amount * 100)
+            Transaction.objects.filter(pk=transaction.pk).update(date=datetime.date(2021, 5, amount))
+
+    def test_streaming_export(self):
+        with override_settings(TRANSACTIONS_EXPORT_CHUNK_SIZE=7):
+            start, body = asgi_get(self.admin, reverse('api:export_transactions'),
+                                   b'output=ndjson&from_date=2021-05-05&to_date=2021-05-24')
+        self.assertEqual(start['status'], 200)
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual([row['amount'] for row in rows], [float(amount) for amount in range(5, 25)])
+        self.assertEqual([row['date'] for row in rows], [f'2021-05-{day:02}' for day in range(5, 25)])
+
+    def test_command_output(self):
+        output = StringIO()
+        call_command('export_transactions', '--from-date', '2021-05-29', '--chunk-size', '1', stdout=output)
+        self.assertEqual(output.getvalue().splitlines(), [
+            'id,user_id,date,amount',
+            f'{self.user.transactions.get(amount=2900).pk},{self.user.pk},2021-05-29,29.00',
+            f'{self.user.transactions.get(amount=3000).pk},{self.user.pk},2021-05-30,30.00',
+        ])
+
+
+@mock.patch('api.backends.verify_password', side_effect=PasswordHashingUnavailable)
+class PasswordHashingUnavailableTests(APITestCase):
+    def test_token(self, verify_password):
+        response = self.client.post(reverse('api:token_obtain_pair'), {'email': self.user.email, 'password': 'password'},
+                                    format='json')
+        self.assertEqual(response.status_code, 503)
+
+    def test_admin_login(self, verify_password):
+        with self.assertLogs('api.backends', 'WARNING'):
+            response = Client().post('/admin/login/', {'username': self.admin.email, 'password': 'password'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
+
+
+@override_settings(REQUEST_METRICS=True, REQUEST_METRICS_SAMPLE_RATE=1.0)
+class RequestMetricsTests(APITestCase):
+    def server_timing(self, headers):
+        return dict(timing.split(';', 1) for timing in headers['Server-Timing'].split(', '))
+
+    def test_asgi(self):
+        async def get_response(request):
+            pass
+
+        self.assertTrue(asyncio.iscoroutinefunction(RequestMetricsMiddleware(get_response)))
+        self.assertFalse(asyncio.iscoroutinefunction(RequestMetricsMiddleware(lambda request: None)))
+        start, body = asgi_get(self.admin, reverse('api:all_users'))
+        self.assertEqual(start['status'], 200)
+        timing = self.server_timing({name.decode(): value.decode() for name, value in start['headers']})
+        # The queries of the sync view run in the other thread are timed too
+        self.assertNotIn('desc="0 queries"', timing['db'])
+        self.assertIn('serializer', timing)
+
+    def test_serializer_not_measured(self):
+        self.assertNotIn('serializer', self.server_timing(self.client.get(reverse('api:cache_stats'))))
+        with override_settings(COMPILED_SERIALIZERS=False):
+            self.assertIn('serializer', self.server_timing(self.client.get(reverse('api:all_users'))))
+
+    def test_unknown_method(self):
+        self.client.generic('PROPFIND', reverse('api:cache_stats'))
+        routes = dict(request_metrics.snapshot())
+        self.assertIn(('api:cache_stats', 'other'), routes)
+        self.assertNotIn(('api:cache_stats', 'PROPFIND'), routes)
+
+
+class BulkTransactionsTests(APITestCase):
+    def test_user_references(self):
+        rows = [
+            {'user': self.user.pk, 'amount': 1},
+            {'user': str(self.user.pk), 'amount': 2},
+            {'user': self.user.email, 'amount': 3},
+            {'user': self.user.pk + 0.5, 'amount': 4},
+            {'user': True, 'amount': 5},
+            {'user': float(self.user.pk), 'amount': 6},
+            {'user': ' %d' % self.user.pk, 'amount': 7},
+            {'user': [self.user.pk], 'amount': 8},
+        ]
+        response = self.client.post(reverse('api:bulk_create_transactions'), rows, format='json')
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual(data['created'], 3)
+        self.assertEqual([error['row'] for error in data['errors']], [3, 4, 5, 6, 7])
+        self.assertEqual(sorted(Transaction.objects.values_list('amount', flat=True)), [100, 200, 300])
+
+
+class UserImportTests(APITestCase):
+    def rows(self, count):
+        return [{'email': f'import{number}@example.com', 'password': 'password', 'first_name': 'First',
+                 'last_name': 'Last'} for number in range(count)]
+
+    @override_settings(USERS_IMPORT_MAX_ROWS=3)
+    def test_rows_limit(self):
+        response = self.client.post(reverse('api:bulk_create_users'), self.rows(4), format='json')
+        self.assertEqual(response.status_code, 413)
+        response = self.client.post(reverse('api:bulk_create_users'), self.rows(3), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 3)
+        self.assertTrue(AkvelonUser.objects.get(email='import0@example.com').check_password('password'))
+
+    def test_insert_concurrently_created(self):
+        chunk = [(index, AkvelonUser(email=email, first_name='First', last_name='Last'))
+                 for index, email in enumerate(['a@example.com', self.user.email, 'b@example.com'])]
+        errors = []
+        self.assertEqual(insert_users(chunk, errors), 2)
+        self.assertEqual([error['row'] for error in errors], [1])
+
+    def test_insert_one_by_one(self):
+        # The duplicate inside the chunk fails the chunk without the existing users, so the users are inserted one by one
+        chunk = [(index, AkvelonUser(email=email, first_name='First', last_name='Last'))
+                 for index, email in enumerate(['a@example.com', 'a@example.com', 'b@example.com'])]
+        errors = []
+        self.assertEqual(insert_users(chunk, errors), 2)
+        self.assertEqual(errors, [{'row': 1, 'errors': {'email': ['User with this email already exists']}}])
+        self.assertEqual(AkvelonUser.objects.filter(email__in=['a@example.com', 'b@example.com']).count(), 2)
+
+
+class SeedTests(TransactionWritesTestCase):
+    def test_not_contiguous_users(self):
+        first = AkvelonUser.objects.create_user('first@example.com', 'password', 'First', 'Seeded')
+        self.user = AkvelonUser.objects.create_user('other@example.com', 'password', 'Other', 'User')
+        last = AkvelonUser.objects.create_user('last@example.com', 'password', 'Last', 'Seeded')
+        # The seeded users are not contiguous, the user between them must not be recalculated
+        self.create(10)
+        TransactionDailySummary.objects.filter(user=self.user).update(income_sum=1)
+        AkvelonUser.objects.filter(pk=self.user.pk).update(balance=500)
+        with mock.patch('api.management.commands.seed.Command.create_users', return_value=[first.pk, last.pk]):
+            call_command('seed', users=2, transactions=40, seed=1, batch_size=1, stdout=StringIO())
+        self.assertEqual(TransactionDailySummary.objects.get(user=self.user).income_sum, 1)
+        self.assertEqual(AkvelonUser.objects.values_list('balance', 'transactions_version').get(pk=self.user.pk),
+                         (500, 1))
+        self.assertEqual(Transaction.objects.filter(user_id__in=[first.pk, last.pk]).count(), 40)
+        for user in (first, last):
+            call_command('check_balances', '--user', str(user.pk), stdout=StringIO(), stderr=StringIO())
+            call_command('rebuild_transaction_summaries', '--verify', '--user', str(user.pk), stdout=StringIO())
+
+
+class BalanceTests(TransactionWritesTestCase):
+    def assertBalance(self, balance, income, outcome):
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.balance, self.user.income_total, self.user.outcome_total), (balance, income, outcome))
+        response = self.client.get(reverse('api:user_balance', args=[self.user.pk]))
+        self.assertEqual(response.json(), {
+            'id': self.user.pk,
+            'balance': balance / 100,
+            'income_total': income / 100,
+            'outcome_total': outcome / 100,
+        })
+
+    def test_create(self):
+        self.create(12.5)
+        self.create(-3)
+        self.assertBalance(950, 1250, -300)
+
+    def test_update_same_sign(self):
+        transaction = self.create(10)
+        self.update(transaction, 25)
+        self.assertBalance(2500, 2500, 0)
+
+    def test_update_sign_flip(self):
+        transaction = self.create(10)
+        self.update(transaction, -4)
+        self.assertBalance(-400, 0, -400)
+
+    def test_delete(self):
+        transaction = self.create(10)
+        self.create(-5)
+        self.client.delete(reverse('api:delete_transaction', args=[transaction.pk]))
+        self.assertBalance(-500, 0, -500)
+
+    def test_queryset_delete(self):
+        self.create(10)
+        self.create(-5)
+        Transaction.objects.filter(user=self.user, amount__gt=0).delete()
+        self.assertBalance(-500, 0, -500)
+
+    def test_user_responses_have_no_balances(self):
+        self.create(10)
+        response = self.client.post(reverse('api:create_user'), {
+            'email': 'new@example.com', 'password': 'password', 'first_name': 'New', 'last_name': 'User',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(set(response.json()) & set(AkvelonUser.COUNTER_FIELDS))
+        response = self.client.patch(reverse('api:update_user', args=[self.user.pk]), {'first_name': 'Changed'},
+                                     format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(set(response.json()) & set(AkvelonUser.COUNTER_FIELDS))
+        response = self.client.patch(reverse('api:update_user', args=[self.user.pk]), {'balance': 0}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertBalance(1000, 1000, 0)
+
+
+@override_settings(USER_CACHE_ALLOW_PROCESS_LOCAL=True)
+class UserCacheTests(APITestCase):
+    def setUp(self):
+        super(UserCacheTests, self).setUp()
+        get_user_cache().clear()
+
+    def test_disabled_with_process_local_backend(self):
+        self.assertEqual(check_user_cache(None), [])
+        with override_settings(USER_CACHE_ALLOW_PROCESS_LOCAL=False):
+            self.assertFalse(is_user_cache_enabled())
+            self.assertEqual([warning.id for warning in check_user_cache(None)], ['api.W001'])
+            self.client.get(reverse('api:get_user_by_id', args=[self.user.pk]))
+            self.assertIsNone(get_user_cache().get(USER_VERSION_KEY.format(self.user.pk)))
+
+    def test_stale_load_is_not_read(self):
+        url = reverse('api:get_user_by_id', args=[self.user.pk])
+        loaded = []
+
+        # The user is changed while the old state is loaded, so the old state is stored under the replaced version
+        def loader():
+            loaded.append(1)
+            data = {'id': self.user.pk, 'email': self.user.email, 'first_name': 'First'}
+            AkvelonUser.objects.filter(pk=self.user.pk).update(first_name='Changed')
+            invalidate_user(self.user)
+            return data
+
+        get_user_payload_by_id(self.user.pk, loader)
+        self.assertEqual(self.client.get(url).json()['first_name'], 'Changed')
+        self.assertEqual(loaded, [1])
+
+    def test_update_invalidates(self):
+        url = reverse('api:get_user_by_email', args=[self.user.email])
+        self.assertEqual(self.client.get(url).json()['first_name'], 'First')
+        self.assertEqual(self.client.get(url).json()['first_name'], 'First')
+        self.client.patch(reverse('api:update_user', args=[self.user.pk]), {'first_name': 'Changed'}, format='json')
+        self.assertEqual(self.client.get(url).json()['first_name'], 'Changed')
+
+    def test_auth_user_queries(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer ' + str(AccessToken.for_user(self.user)))
+        url = reverse('api:get_user_by_id', args=[self.user.pk])
+        # The authenticated user and the payload are loaded once, then both are read from the cache
+        with self.assertNumQueries(2):
+            self.assertEqual(client.get(url).status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(client.get(url).status_code, 200)
+        with override_settings(USER_CACHE_ALLOW_PROCESS_LOCAL=False), self.assertNumQueries(2):
+            self.assertEqual(client.get(url).status_code, 200)
+
+    def test_auth_user_without_password(self):
+        client = APIClient()
+        token = self.client.post(reverse('api:token_obtain_pair'), {'email': self.user.email, 'password': 'password'},
+                                 format='json').json()['access']
+        client.credentials(HTTP_AUTHORIZATION='Bearer ' + token)
+        url = reverse('api:get_user_by_id', args=[self.user.pk])
+        self.assertEqual(client.get(url).status_code, 200)
+        cache = get_user_cache()
+        values = cache.get(AUTH_USER_KEY.format(self.user.pk, get_user_version(cache, self.user.pk)))
+        self.assertEqual(len(values), len(AUTH_USER_FIELDS))
+        self.assertNotIn(self.user.password, values)
+        self.assertEqual(client.get(url).status_code, 200)
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(client.get(url).status_code, 401)
+
+
+"""
+    Base class of the read endpoints tests with the transactions of two users around the week, month and year
+    boundaries. The dates are set by update(), so the daily summaries are rebuilt afterwards
+"""
+class ReadTestCase(APITestCase):
+    # (date, amount in cents) of the transactions of every user
+    TRANSACTIONS = [
+        ('2020-12-31', 1000), ('2020-12-31', -250), ('2021-01-01', 1999), ('2021-01-03', -5),
+        ('2021-01-04', 30000), ('2021-01-04', -1), ('2021-05-31', 12345), ('2021-06-01', -700),
+    ]
+
+    def setUp(self):
+        super(ReadTestCase, self).setUp()
+        self.other = AkvelonUser.objects.create_user('anna@test.org', 'password', 'Anna', 'Smith')
+        for user in (self.user, self.other):
+            for date, amount in self.TRANSACTIONS:
+                transaction = Transaction.objects.create(user=user, amount=amount)
+                Transaction.objects.filter(pk=transaction.pk).update(date=datetime.date.fromisoformat(date))
+        call_command('rebuild_transaction_summaries', stdout=StringIO())
+        self.transaction = self.user.transactions.order_by('id').first()
+
+
+@override_settings(TRANSACTIONS_JSON_AGG=False)
+class CompiledSerializerTests(ReadTestCase):
+    def routes(self):
+        user, transaction = self.user.pk, self.transaction.pk
+        return [
+            ('api:all_users', [], ''),
+            ('api:all_users', [], '?sort=-last_name&page_size=2'),
+            ('api:all_users', [], '?q=smith'),
+            ('api:get_user_by_id', [user], ''),
+            ('api:get_user_by_email', [self.user.email], ''),
+            ('api:user_balance', [user], ''),
+            ('api:user_transactions', [user], ''),
+            ('api:user_transactions', [user], '?from_date=2021-01-01&to_date=2021-01-04'),
+            ('api:user_income_transactions', [user], ''),
+            ('api:user_outcome_transactions', [user], '?from_date=2021-01-01'),
+            ('api:user_income_transactions_summary', [user], ''),
+            ('api:user_income_transactions_summary', [user], '?granularity=week'),
+            ('api:user_outcome_transactions_summary', [user], '?granularity=month&to_date=2021-05-31'),
+            ('api:user_outcome_transactions_summary', [user], '?granularity=year'),
+            ('api:get_transaction', [transaction], ''),
+            ('api:get_transaction', [transaction], '?user=id'),
+            ('api:all_transactions', [], ''),
+            ('api:all_transactions', [], '?user=id&sort=-amount&page_size=3'),
+            ('api:all_transactions', [], '?type=income&from_date=2021-01-01&expand=user'),
+        ]
+
+    def test_every_compiled_route(self):
+        from .urls import urlpatterns
+        from .views import CompiledReadMixin
+        compiled_routes = {
+            f'api:{pattern.name}' for pattern in urlpatterns
+            if issubclass(getattr(pattern.callback, 'view_class', object), CompiledReadMixin)
+        }
+        self.assertEqual({name for name, _, _ in self.routes()}, compiled_routes)
+
+    def test_same_output(self):
+        for name, args, query in self.routes():
+            with self.subTest(name=name, query=query):
+                url = reverse(name, args=args) + query
+                compiled = self.client.get(url)
+                with override_settings(COMPILED_SERIALIZERS=False):
+                    serialized = self.client.get(url)
+                self.assertEqual(compiled.status_code, 200)
+                self.assertEqual(compiled.content, serialized.content)
+
+
+
+class TransactionUserExpandTests(ReadTestCase):
+    """
+        Method for getting the response data, checks that it is read by one query which joins the users
+        only for the nested user
+    """
+    def get_by_one_query(self, url, expanded):
+        with self.assertNumQueries(1) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AkvelonUser._meta.db_table in queries[0]['sql'], expanded)
+        return response.json()
+
+    def assertUser(self, data, expanded):
+        if expanded:
+            self.assertEqual((data['user']['id'], data['user']['email']), (self.user.pk, self.user.email))
+            self.assertNotIn('password', data['user'])
+        else:
+            self.assertEqual(data['user'], self.user.pk)
+
+    def test_list(self):
+        for compiled in (True, False):
+            for query, expanded in [('', True), ('?expand=user', True), ('?user=id', False)]:
+                with self.subTest(compiled=compiled, query=query), override_settings(COMPILED_SERIALIZERS=compiled):
+                    rows = self.get_by_one_query(reverse('api:all_transactions') + query, expanded)['results']
+                    self.assertEqual(len(rows), 2 * len(self.TRANSACTIONS))
+                    self.assertUser(rows[0], expanded)
+                    users = {row['user']['id'] if expanded else row['user'] for row in rows}
+                    self.assertEqual(users, {self.user.pk, self.other.pk})
+
+    def test_retrieve(self):
+        url = reverse('api:get_transaction', args=[self.transaction.pk])
+        for compiled in (True, False):
+            for query, expanded in [('', True), ('?expand=user', True), ('?user=id', False)]:
+                with self.subTest(compiled=compiled, query=query), override_settings(COMPILED_SERIALIZERS=compiled):
+                    data = self.get_by_one_query(url + query, expanded)
+                    self.assertEqual((data['id'], data['date'], data['amount']),
+                                     (self.transaction.pk, '2020-12-31', 10.0))
+                    self.assertUser(data, expanded)
+
+
+class SummaryGranularityTests(ReadTestCase):
+    # Buckets start on Monday for the weeks: 2020-12-31 - 2021-01-03 are in the week of 2020-12-28
+    CASES = [
+        ('income', '', [('2020-12-31', 10.0), ('2021-01-01', 19.99), ('2021-01-04', 300.0), ('2021-05-31', 123.45)]),
+        ('outcome', '', [('2020-12-31', -2.5), ('2021-01-03', -0.05), ('2021-01-04', -0.01), ('2021-06-01', -7.0)]),
+        ('income', '?granularity=week', [('2020-12-28', 29.99), ('2021-01-04', 300.0), ('2021-05-31', 123.45)]),
+        ('outcome', '?granularity=week', [('2020-12-28', -2.55), ('2021-01-04', -0.01), ('2021-05-31', -7.0)]),
+        ('income', '?granularity=month', [('2020-12-01', 10.0), ('2021-01-01', 319.99), ('2021-05-01', 123.45)]),
+        ('outcome', '?granularity=month', [('2020-12-01', -2.5), ('2021-01-01', -0.06), ('2021-06-01', -7.0)]),
+        ('income', '?granularity=year', [('2020-01-01', 10.0), ('2021-01-01', 443.44)]),
+        ('outcome', '?granularity=year', [('2020-01-01', -2.5), ('2021-01-01', -7.06)]),
+        # The date range is applied to the days before they are grouped
+        ('income', '?granularity=month&from_date=2021-01-02&to_date=2021-05-31',
+         [('2021-01-01', 300.0), ('2021-05-01', 123.45)]),
+        ('outcome', '?granularity=week&from_date=2021-01-01&to_date=2021-01-03', [('2020-12-28', -0.05)]),
+        ('income', '?granularity=year&from_date=2022-01-01', []),
+    ]
+
+    def test_buckets(self):
+        for transactions_type, query, expected in self.CASES:
+            with self.subTest(transactions_type=transactions_type, query=query):
+                url = reverse(f'api:user_{transactions_type}_transactions_summary', args=[self.user.pk]) + query
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual([(row['date'], row['sum']) for row in response.json()['transactions_summary']],
+                                 expected)
+
+    def test_invalid_query(self):
+        for query in ('?granularity=hour', '?from_date=2021-13-01'):
+            with self.subTest(query=query):
+                url = reverse('api:user_income_transactions_summary', args=[self.user.pk]) + query
+                self.assertEqual(self.client.get(url).status_code, 400)
+
+
+class UsersSearchTests(ReadTestCase):
+    def setUp(self):
+        super(UsersSearchTests, self).setUp()
+        AkvelonUser.objects.create_user('boris@smith.io', 'password', 'Boris', 'Petrov')
+
+    def search(self, query):
+        url = reverse('api:all_users') + query
+        emails = []
+        while url is not None:
+            with self.assertNumQueries(1):
+                data = self.client.get(url).json()
+            emails.extend(row['email'] for row in data['results'])
+            url = data['next']
+        return emails
+
+    def test_search(self):
+        cases = [
+            ('smith', ['anna@test.org', 'boris@smith.io']),
+            ('ANNA', ['anna@test.org']),
+            ('Fir', ['user@example.com']),
+            ('example.com', ['admin@example.com', 'user@example.com']),
+            ('  petrov ', ['boris@smith.io']),
+            ('zzz', []),
+            ('  ', ['admin@example.com', 'user@example.com', 'anna@test.org', 'boris@smith.io']),
+        ]
+        for q, expected in cases:
+            with self.subTest(q=q):
+                self.assertEqual(sorted(self.search(f'?q={q}')), sorted(expected))
+
+    def test_search_sorted_pages(self):
+        # The admin has no "s" in the email and names
+        self.assertEqual(self.search('?q=s&sort=-first_name&page_size=1'),
+                         ['user@example.com', 'boris@smith.io', 'anna@test.org'])
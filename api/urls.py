@@ -20,6 +20,7 @@ from drf_yasg import openapi
 from rest_framework import permissions
 
 from .views import *
+from .async_views import read_view
 
 schema_view = get_schema_view(
    openapi.Info(
@@ -36,23 +37,31 @@ app_name = 'api'
 urlpatterns = [
     # users
     path('user/create/', UserCreateAPIView.as_view(), name='create_user'),
-    path('user/all/', UsersListAPIView.as_view(), name='all_users'),
-    path('user/<int:pk>/', UserGetByIdAPIView.as_view(), name='get_user_by_id'),
-    path('user/<str:email>/', UserGetByEmailAPIView.as_view(), name='get_user_by_email'),
+    path('user/all/', read_view(UsersListAPIView), name='all_users'),
+    path('user/bulk/', UserBulkCreateAPIView.as_view(), name='bulk_create_users'),
+    path('user/<int:pk>/', read_view(UserGetByIdAPIView), name='get_user_by_id'),
+    path('user/<str:email>/', read_view(UserGetByEmailAPIView), name='get_user_by_email'),
     path('user/update/<int:pk>/', UserUpdateAPIView.as_view(), name='update_user'),
     path('user/delete/<int:pk>/', UserDeleteAPIView.as_view(), name='delete_user'),
     # user transactions
-    path('user/<int:pk>/transactions/', UserTransactionsAPIView.as_view(), name='user_transactions'),
-    path('user/<int:pk>/transactions/income/', UserIncomeTransactionsAPIView.as_view(), name='user_income_transactions'),
-    path('user/<int:pk>/transactions/income/summary/', UserIncomeTransactionsSummaryAPIView.as_view(), name='user_income_transactions_summary'),
-    path('user/<int:pk>/transactions/outcome/', UserOutcomeTransactionsAPIView.as_view(), name='user_outcome_transactions'),
-    path('user/<int:pk>/transactions/outcome/summary/', UserOutcomeTransactionsSummaryAPIView.as_view(), name='user_outcome_transactions_summary'),
+    path('user/<int:pk>/balance/', read_view(UserBalanceAPIView), name='user_balance'),
+    path('user/<int:pk>/transactions/', read_view(UserTransactionsAPIView), name='user_transactions'),
+    path('user/<int:pk>/transactions/income/', read_view(UserIncomeTransactionsAPIView), name='user_income_transactions'),
+    path('user/<int:pk>/transactions/income/summary/', read_view(UserIncomeTransactionsSummaryAPIView), name='user_income_transactions_summary'),
+    path('user/<int:pk>/transactions/outcome/', read_view(UserOutcomeTransactionsAPIView), name='user_outcome_transactions'),
+    path('user/<int:pk>/transactions/outcome/summary/', read_view(UserOutcomeTransactionsSummaryAPIView), name='user_outcome_transactions_summary'),
     # transactions
     path('transaction/create/', TransactionCreateAPIView.as_view(), name='create_transaction'),
-    path('transaction/<int:pk>/', TransactionGetAPIView.as_view(), name='get_transaction'),
+    path('transaction/bulk/', TransactionBulkCreateAPIView.as_view(), name='bulk_create_transactions'),
+    path('transaction/<int:pk>/', read_view(TransactionGetAPIView), name='get_transaction'),
     path('transaction/update/<int:pk>/', TransactionsUpdateAPIView.as_view(), name='update_transaction'),
     path('transaction/delete/<int:pk>/', TransactionDeleteAPIView.as_view(), name='delete_transaction'),
-    path('transaction/all/', TransactionsListAPIView.as_view(), name='all_transactions'),
+    path('transaction/all/', read_view(TransactionsListAPIView), name='all_transactions'),
+    path('transaction/export/', TransactionsExportAPIView.as_view(), name='export_transactions'),
+    # caches
+    path('cache/stats/', read_view(CacheStatsAPIView), name='cache_stats'),
+    path('hashing/stats/', read_view(HashingStatsAPIView), name='hashing_stats'),
+    path('metrics/', read_view(MetricsAPIView), name='metrics'),
     # tokens
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
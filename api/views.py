@@ -1,9 +1,16 @@
+from django.conf import settings
+from django.db import transaction
 from django.db.models import Prefetch
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.filters import OrderingFilter
+from rest_framework.parsers import JSONParser
 from django_filters import rest_framework as filters
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
@@ -11,12 +18,27 @@ from drf_yasg.utils import swagger_auto_schema
 from .models import AkvelonUser, Transaction
 from .serializers import (UserSerializer,
                           UserGetSerializer,
+                          UserBalanceSerializer,
                           TransactionSerializer,
+                          TransactionFlatSerializer,
                           TransactionCreateSerializer,
                           UserTransactionsSerializer,
                           UserIncomeTransactionsSummarySerializer,
-                          UserOutcomeTransactionsSummarySerializer)
+                          UserOutcomeTransactionsSummarySerializer,
+                          TransactionsSummaryQuerySerializer)
 from .permissions import UpdatedPermission
+from .pagination import TransactionsPagination, UsersPagination
+from .parsers import CSVParser, NDJSONParser
+from .bulk import import_users, ingest_transactions
+from .export import EXPORT_FORMATS, export_transactions
+from .filters import TransactionsDateFilter, TransactionsExportFilter, UsersSearchFilter
+from .etags import user_transactions_etag
+from .compiled import compile_serializer
+from .hashing import hashing_stats
+from .metrics import measure_serializer, render_prometheus
+from .json_agg import is_json_agg_supported, parse_json_agg_dates, user_transactions_head, user_transactions_json
+from .cache import (get_user_payload_by_email, get_user_payload_by_id, invalidate_user, is_user_cache_enabled,
+                    user_cache_stats, auth_cache_stats)
 
 
 class UserCreateAPIView(generics.CreateAPIView):
@@ -90,24 +112,87 @@ class UserUpdateAPIView(generics.UpdateAPIView):
 
         if serializer.is_valid(raise_exception=True):
             self.perform_update(serializer)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            with measure_serializer(request):
+                data = serializer.data
+            return Response(data, status=status.HTTP_200_OK)
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def perform_update(self, serializer):
+        super(UserUpdateAPIView, self).perform_update(serializer)
+        invalidate_user(serializer.instance)
 
-class UserGetByIdAPIView(generics.RetrieveAPIView):
+
+"""
+    Mixin for the read views which selects only the serialized columns with .values() and converts the rows
+    by the compiled serializer (see api/compiled.py) instead of the model instances and the serializer
+"""
+class CompiledReadMixin:
+    def get_compiled_serializer(self):
+        if not settings.COMPILED_SERIALIZERS:
+            return None
+        return compile_serializer(self.get_serializer_class(), self.get_serializer_context())
+
+    """
+        Method for getting the serialized object, the same lookup and permission checks as get_object() are used
+    """
+    def get_object_data(self):
+        compiled = self.get_compiled_serializer()
+        if compiled is None:
+            instance = self.get_object()
+            with measure_serializer(self.request):
+                return self.get_serializer(instance).data
+        queryset = compiled.values(self.filter_queryset(self.get_queryset()))
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        self.check_object_permissions(self.request, row)
+        with measure_serializer(self.request):
+            return compiled.serialize([row])[0]
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(self.get_object_data())
+
+    def list(self, request, *args, **kwargs):
+        compiled = self.get_compiled_serializer()
+        if compiled is None:
+            queryset = self.filter_queryset(self.get_queryset())
+            page = self.paginate_queryset(queryset)
+            with measure_serializer(request):
+                data = self.get_serializer(queryset if page is None else page, many=True).data
+        else:
+            queryset = compiled.values(self.filter_queryset(self.get_queryset()))
+            page = self.paginate_queryset(queryset)
+            with measure_serializer(request):
+                data = compiled.serialize(queryset if page is None else page)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+
+"""
+    Mixin for the user lookup views which returns the serialized user from the cache (see api/cache.py)
+"""
+class CachedUserRetrieveMixin(CompiledReadMixin):
+    def load_user(self):
+        return self.get_object_data()
+
+
+class UserGetByIdAPIView(CachedUserRetrieveMixin, generics.RetrieveAPIView):
     serializer_class = UserGetSerializer
     permission_classes = [IsAuthenticated]
     queryset = AkvelonUser.objects.all()
     lookup_field = 'pk'
 
+    def retrieve(self, request, *args, **kwargs):
+        return Response(get_user_payload_by_id(kwargs[self.lookup_field], self.load_user))
+
 
 """
     API view for getting user by the email
 """
 
 
-class UserGetByEmailAPIView(generics.RetrieveAPIView):
+class UserGetByEmailAPIView(CachedUserRetrieveMixin, generics.RetrieveAPIView):
     serializer_class = UserGetSerializer
     permission_classes = [IsAuthenticated]
     queryset = AkvelonUser.objects.all()
@@ -115,6 +200,62 @@ class UserGetByEmailAPIView(generics.RetrieveAPIView):
     lookup_url_kwarg = 'email'
     lookup_value_regex = '^(\w|\.|\_|\-)+[@](\w|\_|\-|\.)+[.]\w{2,3}$'
 
+    def retrieve(self, request, *args, **kwargs):
+        return Response(get_user_payload_by_email(kwargs[self.lookup_url_kwarg], self.load_user))
+
+
+"""
+    API view for importing many users by one request. Body is the CSV with the header row, NDJSON (JSON lines)
+    or JSON array of the users with the email, password, first_name and last_name
+"""
+class UserBulkCreateAPIView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    parser_classes = [JSONParser, NDJSONParser, CSVParser]
+    queryset = AkvelonUser.objects.all()
+    filter_backends = []
+
+    chunk_size = openapi.Parameter('chunk_size', openapi.IN_QUERY,
+                                   description="number of users inserted at once",
+                                   type=openapi.TYPE_INTEGER, required=False)
+
+    @swagger_auto_schema(
+        manual_parameters=[chunk_size],
+        request_body=openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'email': openapi.Schema(type=openapi.TYPE_STRING),
+                'password': openapi.Schema(type=openapi.TYPE_STRING),
+                'first_name': openapi.Schema(type=openapi.TYPE_STRING),
+                'last_name': openapi.Schema(type=openapi.TYPE_STRING),
+            }
+        )),
+        responses={
+            status.HTTP_201_CREATED: 'Number of created users and errors of the rejected rows',
+            status.HTTP_400_BAD_REQUEST: 'Body is not a list or no users were created',
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE: 'More than USERS_IMPORT_MAX_ROWS users',
+            status.HTTP_503_SERVICE_UNAVAILABLE: 'Password hashing is overloaded',
+        }
+    )
+    def post(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return Response(status=status.HTTP_400_BAD_REQUEST, data={'error': 'List of users expected'})
+        try:
+            chunk_size = int(request.query_params.get('chunk_size', settings.USERS_IMPORT_CHUNK_SIZE))
+        except ValueError:
+            return Response(status=status.HTTP_400_BAD_REQUEST, data={'error': 'Invalid chunk size'})
+        chunk_size = min(max(chunk_size, 1), settings.USERS_IMPORT_MAX_CHUNK_SIZE)
+        if len(request.data) > settings.USERS_IMPORT_MAX_ROWS:
+            return Response(status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, data={
+                'error': f'At most {settings.USERS_IMPORT_MAX_ROWS} users per request, '
+                         f'use the import_users command for the larger imports'
+            })
+
+        created, errors = import_users(request.data, chunk_size)
+        data = {'created': created, 'failed': len(errors), 'errors': errors}
+        if created == 0 and errors:
+            return Response(status=status.HTTP_400_BAD_REQUEST, data=data)
+        return Response(status=status.HTTP_201_CREATED, data=data)
+
 
 class UserDeleteAPIView(generics.DestroyAPIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
@@ -122,27 +263,62 @@ class UserDeleteAPIView(generics.DestroyAPIView):
     lookup_field = 'pk'
 
 
-class UsersListAPIView(generics.ListAPIView):
+class UsersListAPIView(CompiledReadMixin, generics.ListAPIView):
     queryset = AkvelonUser.objects.all()
     serializer_class = UserGetSerializer
     permission_classes = [IsAuthenticated]
-    # Two fields for providing users sorting by the first name, last name or both
-    filter_backends = [OrderingFilter]
-    ordering_fields = ['first_name', 'last_name']
-
+    filter_backends = [filters.DjangoFilterBackend]
+    filter_class = UsersSearchFilter
+    # Sorting by the first name, last name or both is done by the pagination (see UsersPagination)
+    pagination_class = UsersPagination
+
+    q = openapi.Parameter('q', openapi.IN_QUERY,
+                          description="search users by the part of the <b>email</b>, <b>first_name</b> or <b>last_name</b>",
+                          type=openapi.TYPE_STRING,
+                          required=False)
     sort = openapi.Parameter('sort', openapi.IN_QUERY,
                              description="sort users by the <b>first_name</b>, <b>last_name</b> or <b>both</b>. Use '-' sign for reverse sorting",
                              type=openapi.TYPE_STRING,
                              required=False)
+    cursor = openapi.Parameter('cursor', openapi.IN_QUERY,
+                               description="opaque cursor taken from the <b>next</b> or <b>previous</b> link of the previous page",
+                               type=openapi.TYPE_STRING,
+                               required=False)
+    page_size = openapi.Parameter('page_size', openapi.IN_QUERY,
+                                  description="number of users per page (default 100, max 1000)",
+                                  type=openapi.TYPE_INTEGER,
+                                  required=False)
 
     @swagger_auto_schema(
-        manual_parameters=[sort],
+        manual_parameters=[q, sort, cursor, page_size],
     )
     def get(self, request, *args, **kwargs):
         return super(UsersListAPIView, self).get(request, *args, **kwargs)
 
 
-class UserTransactionsAPIView(generics.RetrieveAPIView):
+"""
+    Mixin for the user transactions views which streams the JSON response built by PostgreSQL
+    (see api/json_agg.py) when JSON is requested, other cases are handled by the serializer
+"""
+class UserTransactionsJSONAggMixin:
+    transactions_type = None
+
+    def use_json_agg(self):
+        return (settings.TRANSACTIONS_JSON_AGG and is_json_agg_supported()
+                and self.request.accepted_renderer.format == 'json')
+
+    def retrieve(self, request, *args, **kwargs):
+        dates = parse_json_agg_dates(request.query_params) if self.use_json_agg() else None
+        head = None if dates is None else user_transactions_head(kwargs[self.lookup_field])
+        if head is None:
+            return super(UserTransactionsJSONAggMixin, self).retrieve(request, *args, **kwargs)
+        content = user_transactions_json(kwargs[self.lookup_field], head, *dates,
+                                         transactions_type=self.transactions_type,
+                                         chunk_size=settings.TRANSACTIONS_JSON_AGG_CHUNK_SIZE)
+        return StreamingHttpResponse(content, content_type='application/json')
+
+
+class UserTransactionsAPIView(UserTransactionsJSONAggMixin, CompiledReadMixin, generics.RetrieveAPIView):
     queryset = AkvelonUser.objects.all()
     permission_classes = [IsAuthenticated]
     serializer_class = UserTransactionsSerializer
@@ -177,11 +353,13 @@ class UserTransactionsAPIView(generics.RetrieveAPIView):
     @swagger_auto_schema(
         manual_parameters=[from_date, to_date],
     )
+    @method_decorator(condition(etag_func=user_transactions_etag))
     def get(self, request, *args, **kwargs):
         return super(UserTransactionsAPIView, self).get(request, *args, **kwargs)
 
 
-class UserIncomeTransactionsAPIView(generics.RetrieveAPIView):
+class UserIncomeTransactionsAPIView(UserTransactionsJSONAggMixin, CompiledReadMixin, generics.RetrieveAPIView):
+    transactions_type = 'income'
     queryset = AkvelonUser.objects.all()
     permission_classes = [IsAuthenticated]
     serializer_class = UserTransactionsSerializer
@@ -216,11 +394,13 @@ class UserIncomeTransactionsAPIView(generics.RetrieveAPIView):
     @swagger_auto_schema(
         manual_parameters=[from_date, to_date],
     )
+    @method_decorator(condition(etag_func=user_transactions_etag))
     def get(self, request, *args, **kwargs):
         return super(UserIncomeTransactionsAPIView, self).get(request, *args, **kwargs)
 
 
-class UserOutcomeTransactionsAPIView(generics.RetrieveAPIView):
+class UserOutcomeTransactionsAPIView(UserTransactionsJSONAggMixin, CompiledReadMixin, generics.RetrieveAPIView):
+    transactions_type = 'outcome'
     queryset = AkvelonUser.objects.all()
     permission_classes = [IsAuthenticated]
     serializer_class = UserTransactionsSerializer
@@ -255,23 +435,78 @@ class UserOutcomeTransactionsAPIView(generics.RetrieveAPIView):
     @swagger_auto_schema(
         manual_parameters=[from_date, to_date],
     )
+    @method_decorator(condition(etag_func=user_transactions_etag))
     def get(self, request, *args, **kwargs):
         return super(UserOutcomeTransactionsAPIView, self).get(request, *args, **kwargs)
 
 
-class UserIncomeTransactionsSummaryAPIView(generics.RetrieveAPIView):
+"""
+    API view for getting the stored balance of the user, which is read as one row without the transactions
+"""
+class UserBalanceAPIView(CompiledReadMixin, generics.RetrieveAPIView):
+    queryset = AkvelonUser.objects.only('id', *AkvelonUser.BALANCE_FIELDS)
+    permission_classes = [IsAuthenticated]
+    serializer_class = UserBalanceSerializer
+    lookup_field = 'pk'
+
+    @method_decorator(condition(etag_func=user_transactions_etag))
+    def get(self, request, *args, **kwargs):
+        return super(UserBalanceAPIView, self).get(request, *args, **kwargs)
+
+
+"""
+    Mixin for the summary views which validates the date range and granularity query parameters
+    and passes them to the serializer
+"""
+class TransactionsSummaryMixin:
+    from_date = openapi.Parameter('from_date', openapi.IN_QUERY,
+                                  description="summarize transactions starting from this date (e.g. 2021-05-15)",
+                                  type=openapi.TYPE_STRING, required=False)
+    to_date = openapi.Parameter('to_date', openapi.IN_QUERY,
+                                description="summarize transactions ending to this date (e.g. 2021-05-15)",
+                                type=openapi.TYPE_STRING, required=False)
+    granularity = openapi.Parameter('granularity', openapi.IN_QUERY,
+                                    description="group sums by the <b>day</b> (default), <b>week</b>, <b>month</b> "
+                                                "or <b>year</b>, the date of the group is its first day",
+                                    type=openapi.TYPE_STRING, required=False)
+
+    def get_serializer_context(self):
+        context = super(TransactionsSummaryMixin, self).get_serializer_context()
+        query = TransactionsSummaryQuerySerializer(data=self.request.query_params)
+        query.is_valid(raise_exception=True)
+        context['summary_query'] = query.validated_data
+        return context
+
+
+class UserIncomeTransactionsSummaryAPIView(TransactionsSummaryMixin, CompiledReadMixin, generics.RetrieveAPIView):
     queryset = AkvelonUser.objects.all()
     permission_classes = [IsAuthenticated]
     serializer_class = UserIncomeTransactionsSummarySerializer
     lookup_field = 'pk'
 
+    @swagger_auto_schema(
+        manual_parameters=[TransactionsSummaryMixin.from_date, TransactionsSummaryMixin.to_date,
+                           TransactionsSummaryMixin.granularity],
+    )
+    @method_decorator(condition(etag_func=user_transactions_etag))
+    def get(self, request, *args, **kwargs):
+        return super(UserIncomeTransactionsSummaryAPIView, self).get(request, *args, **kwargs)
+
 
-class UserOutcomeTransactionsSummaryAPIView(generics.RetrieveAPIView):
+class UserOutcomeTransactionsSummaryAPIView(TransactionsSummaryMixin, CompiledReadMixin, generics.RetrieveAPIView):
     queryset = AkvelonUser.objects.all()
     permission_classes = [IsAuthenticated]
     serializer_class = UserOutcomeTransactionsSummarySerializer
     lookup_field = 'pk'
 
+    @swagger_auto_schema(
+        manual_parameters=[TransactionsSummaryMixin.from_date, TransactionsSummaryMixin.to_date,
+                           TransactionsSummaryMixin.granularity],
+    )
+    @method_decorator(condition(etag_func=user_transactions_etag))
+    def get(self, request, *args, **kwargs):
+        return super(UserOutcomeTransactionsSummaryAPIView, self).get(request, *args, **kwargs)
+
 
 class TransactionCreateAPIView(generics.CreateAPIView):
     permission_classes = [IsAuthenticated]
@@ -302,18 +537,104 @@ class TransactionCreateAPIView(generics.CreateAPIView):
         return super(TransactionCreateAPIView, self).post(request, *args, **kwargs)
 
 
-class TransactionGetAPIView(generics.RetrieveAPIView):
+"""
+    Mixin for the transaction read views which chooses between the nested user (default or ?expand=user)
+    and the flat row with the user id only (?user=id). The nested user is fetched by the join in the same
+    query, the flat row does not touch the user table at all
+"""
+class TransactionUserExpandMixin:
+    expand = openapi.Parameter('expand', openapi.IN_QUERY,
+                               description="<b>user</b> to include the nested user object (default)",
+                               type=openapi.TYPE_STRING, required=False)
+    user = openapi.Parameter('user', openapi.IN_QUERY,
+                             description="<b>id</b> to return the user id only instead of the nested user object",
+                             type=openapi.TYPE_STRING, required=False)
+
+    def is_user_expanded(self):
+        query_params = self.request.query_params
+        return query_params.get('expand') == 'user' or query_params.get('user') != 'id'
+
+    def get_serializer_class(self):
+        if self.is_user_expanded():
+            return TransactionSerializer
+        return TransactionFlatSerializer
+
+    def get_queryset(self):
+        queryset = super(TransactionUserExpandMixin, self).get_queryset()
+        if self.is_user_expanded():
+            return queryset.select_related('user')
+        return queryset
+
+
+"""
+    API view for creating many transactions by one request. Body is the JSON array or NDJSON
+    with the same rows as for the create_transaction endpoint
+"""
+class TransactionBulkCreateAPIView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, NDJSONParser]
+    queryset = Transaction.objects.all()
+    filter_backends = []
+
+    chunk_size = openapi.Parameter('chunk_size', openapi.IN_QUERY,
+                                   description="number of rows validated and inserted at once",
+                                   type=openapi.TYPE_INTEGER, required=False)
+
+    @swagger_auto_schema(
+        manual_parameters=[chunk_size],
+        request_body=openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'user': openapi.Schema(type=openapi.TYPE_STRING, description='id or email of the user'),
+                'amount': openapi.Schema(type=openapi.TYPE_NUMBER),
+            }
+        )),
+        responses={
+            status.HTTP_201_CREATED: 'Number of created transactions and errors of the rejected rows',
+            status.HTTP_400_BAD_REQUEST: 'Body is not a list or no rows were created',
+        }
+    )
+    def post(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            return Response(status=status.HTTP_400_BAD_REQUEST, data={'error': 'List of transactions expected'})
+        try:
+            chunk_size = int(request.query_params.get('chunk_size', settings.TRANSACTIONS_BULK_CHUNK_SIZE))
+        except ValueError:
+            return Response(status=status.HTTP_400_BAD_REQUEST, data={'error': 'Invalid chunk size'})
+        chunk_size = min(max(chunk_size, 1), settings.TRANSACTIONS_BULK_MAX_CHUNK_SIZE)
+
+        created, errors = ingest_transactions(request.data, chunk_size)
+        data = {'created': created, 'failed': len(errors), 'errors': errors}
+        if created == 0 and errors:
+            return Response(status=status.HTTP_400_BAD_REQUEST, data=data)
+        return Response(status=status.HTTP_201_CREATED, data=data)
+
+
+class TransactionGetAPIView(TransactionUserExpandMixin, CompiledReadMixin, generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = TransactionSerializer
     queryset = Transaction.objects.all()
     lookup_field = 'pk'
 
+    @swagger_auto_schema(
+        manual_parameters=[TransactionUserExpandMixin.expand, TransactionUserExpandMixin.user],
+    )
+    def get(self, request, *args, **kwargs):
+        return super(TransactionGetAPIView, self).get(request, *args, **kwargs)
+
 
 class TransactionsUpdateAPIView(generics.UpdateAPIView):
     serializer_class = TransactionCreateSerializer
     permission_classes = [IsAuthenticated, IsAdminUser]
     queryset = Transaction.objects.all()
 
+    """
+        Overridden get_queryset() method which locks the transaction row until the end of the update, so
+        the concurrent updates of the same transaction revert its previous state in the daily summary one after another
+    """
+    def get_queryset(self):
+        return super(TransactionsUpdateAPIView, self).get_queryset().select_for_update()
+
     """
         Overridden patch() method for catching read_only fields included in request and
         resolving user by the id or email
@@ -364,6 +685,7 @@ class TransactionsUpdateAPIView(generics.UpdateAPIView):
         Overridden update() method for catching unknown fields included in request
     """
 
+    @transaction.atomic
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
 
@@ -375,7 +697,9 @@ class TransactionsUpdateAPIView(generics.UpdateAPIView):
 
         if serializer.is_valid(raise_exception=True):
             self.perform_update(serializer)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            with measure_serializer(request):
+                data = serializer.data
+            return Response(data, status=status.HTTP_200_OK)
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -386,25 +710,12 @@ class TransactionDeleteAPIView(generics.DestroyAPIView):
     lookup_field = 'pk'
 
 
-"""
-    Custom Filter class for filtering transactions by the date
-"""
-
-
-class TransactionsDateFilter(filters.FilterSet):
-    from_date = filters.DateFilter(field_name="date", lookup_expr='gte')
-    to_date = filters.DateFilter(field_name="date", lookup_expr='lte')
-
-    class Meta:
-        model = Transaction
-        fields = ['date']
-
-
-class TransactionsListAPIView(generics.ListAPIView):
+class TransactionsListAPIView(TransactionUserExpandMixin, CompiledReadMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     queryset = Transaction.objects.all()
     serializer_class = TransactionSerializer
     filter_class = TransactionsDateFilter
+    pagination_class = TransactionsPagination
     # Two fields for providing transactions sorting by the date or amount
     # filter_backends = [OrderingFilter]
     ordering_fields = ['date', 'amount']
@@ -414,13 +725,14 @@ class TransactionsListAPIView(generics.ListAPIView):
     """
 
     def get_queryset(self):
+        queryset = super(TransactionsListAPIView, self).get_queryset()
         type = self.request.query_params.get('type')
         if type is not None:
             if type == 'income':
-                return Transaction.objects.filter(amount__gt=0)
+                return queryset.filter(amount__gt=0)
             elif type == 'outcome':
-                return Transaction.objects.filter(amount__lt=0)
-        return super(TransactionsListAPIView, self).get_queryset()
+                return queryset.filter(amount__lt=0)
+        return queryset
 
     from_date = openapi.Parameter('from_date', openapi.IN_QUERY,
                                   description="filter transactions starting from this date (e.g. 2021-05-15)",
@@ -436,9 +748,99 @@ class TransactionsListAPIView(generics.ListAPIView):
                              description="sort transactions by the <b>date</b> or <b>amount</b>. Use '-' sign for reverse sorting",
                              type=openapi.TYPE_STRING,
                              required=False)
+    cursor = openapi.Parameter('cursor', openapi.IN_QUERY,
+                               description="opaque cursor taken from the <b>next</b> or <b>previous</b> link of the previous page",
+                               type=openapi.TYPE_STRING,
+                               required=False)
+    page_size = openapi.Parameter('page_size', openapi.IN_QUERY,
+                                  description="number of transactions per page (default 100, max 1000)",
+                                  type=openapi.TYPE_INTEGER,
+                                  required=False)
 
     @swagger_auto_schema(
-        manual_parameters=[from_date, to_date, type, sort],
+        manual_parameters=[from_date, to_date, type, sort, cursor, page_size,
+                           TransactionUserExpandMixin.expand, TransactionUserExpandMixin.user],
     )
     def get(self, request, *args, **kwargs):
         return super(TransactionsListAPIView, self).get(request, *args, **kwargs)
+
+
+"""
+    API view for the streaming export of the transactions to CSV or NDJSON
+"""
+class TransactionsExportAPIView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+    queryset = Transaction.objects.all()
+    filter_backends = [filters.DjangoFilterBackend]
+    filter_class = TransactionsExportFilter
+
+    from_date = openapi.Parameter('from_date', openapi.IN_QUERY,
+                                  description="filter transactions starting from this date (e.g. 2021-05-15)",
+                                  type=openapi.TYPE_STRING, required=False)
+    to_date = openapi.Parameter('to_date', openapi.IN_QUERY,
+                                description="filter transactions ending to this date (e.g. 2021-05-15)",
+                                type=openapi.TYPE_STRING, required=False)
+    type = openapi.Parameter('type', openapi.IN_QUERY,
+                             description="type of the transaction: <b>income</b> or <b>outcome</b>",
+                             type=openapi.TYPE_STRING, required=False)
+    user = openapi.Parameter('user', openapi.IN_QUERY,
+                             description="id or email of the user",
+                             type=openapi.TYPE_STRING, required=False)
+    output = openapi.Parameter('output', openapi.IN_QUERY,
+                               description="export format: <b>csv</b> (default) or <b>ndjson</b>",
+                               type=openapi.TYPE_STRING, required=False)
+
+    @swagger_auto_schema(
+        manual_parameters=[from_date, to_date, type, user, output],
+        responses={
+            status.HTTP_200_OK: 'Streamed CSV or NDJSON file',
+            status.HTTP_400_BAD_REQUEST: 'Unknown export format or invalid filters',
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        output_format = request.query_params.get('output', 'csv')
+        if output_format not in EXPORT_FORMATS:
+            return Response(status=status.HTTP_400_BAD_REQUEST, data={'error': 'Unknown export format'})
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(
+            export_transactions(queryset, output_format, settings.TRANSACTIONS_EXPORT_CHUNK_SIZE),
+            content_type=EXPORT_FORMATS[output_format]
+        )
+        response['Content-Disposition'] = f'attachment; filename="transactions.{output_format}"'
+        return response
+
+
+"""
+    API view for the hit and miss counters of the caches in the current process
+"""
+class CacheStatsAPIView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response({
+            'enabled': is_user_cache_enabled(),
+            'users': user_cache_stats.as_dict(),
+            'auth_users': auth_cache_stats.as_dict(),
+        })
+
+
+"""
+    API view for getting the utilisation and wait time of the password hashing pool of this process
+"""
+class HashingStatsAPIView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(hashing_stats.as_dict())
+
+
+"""
+    API view for the request metrics, caches and password hashing pool stats of this process
+    in the Prometheus text format (see api/metrics.py)
+"""
+class MetricsAPIView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    swagger_schema = None
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,144 @@
+"""
+Concurrency benchmark of the WSGI and ASGI serving profiles (see gunicorn.conf.py).
+
+For every profile the script starts gunicorn with SERVER_PROFILE set, sends the requests to the read endpoints
+from --concurrency threads and prints the throughput and latency percentiles. The database and other settings
+are taken from the environment as for the usual run.
+
+Usage:
+    python benchmarks/concurrency.py --email admin@example.com --password secret
+    python benchmarks/concurrency.py --base-url http://localhost:8000 --token <access token>
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PATHS = ['/api/user/all/', '/api/transaction/all/']
+
+
+def percentile(values, fraction):
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+"""
+    Function for starting gunicorn of the profile and waiting until it accepts the connections
+"""
+def start_server(profile, port, workers, timeout=30):
+    env = dict(os.environ, SERVER_PROFILE=profile)
+    server = subprocess.Popen(
+        ['gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(workers)],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f'gunicorn of the {profile} profile exited with the code {server.returncode}')
+        try:
+            requests.get(f'http://127.0.0.1:{port}/api/token/', timeout=1)
+            return server
+        except requests.RequestException:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f'gunicorn of the {profile} profile did not start in {timeout} seconds')
+
+
+def get_token(base_url, email, password):
+    response = requests.post(f'{base_url}/api/token/', json={'email': email, 'password': password})
+    response.raise_for_status()
+    return response.json()['access']
+
+
+"""
+    Function for sending the requests from the concurrent threads, every thread uses its own keep-alive session
+"""
+def run_load(base_url, paths, token, concurrency, total):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker():
+        session = requests.Session()
+        session.headers['Authorization'] = f'Bearer {token}'
+        while True:
+            with lock:
+                number = next(counter, None)
+            if number is None:
+                return
+            started = time.perf_counter()
+            try:
+                ok = session.get(base_url + paths[number % len(paths)]).status_code == 200
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if not ok:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'throughput': len(latencies) / duration,
+        'p50': percentile(latencies, 0.5) * 1000,
+        'p99': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def report(name, result):
+    print(f'{name:>8}: {result["requests"]} requests, {result["errors"]} errors, '
+          f'{result["throughput"]:.1f} req/s, p50 {result["p50"]:.1f} ms, p99 {result["p99"]:.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the throughput and latency of the serving profiles')
+    parser.add_argument('--profiles', nargs='+', default=['wsgi', 'asgi'], choices=['wsgi', 'asgi'])
+    parser.add_argument('--base-url', help='benchmark the already running server instead of starting gunicorn')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers of every profile')
+    parser.add_argument('--path', action='append', dest='paths', help='requested path, can be repeated')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--warmup', type=int, default=100)
+    parser.add_argument('--token', help='JWT access token')
+    parser.add_argument('--email', help='email for getting the token')
+    parser.add_argument('--password', help='password for getting the token')
+    args = parser.parse_args()
+    if args.token is None and (args.email is None or args.password is None):
+        parser.error('--token or --email and --password are required')
+    paths = args.paths or DEFAULT_PATHS
+
+    targets = [('server', args.base_url)] if args.base_url else [(profile, None) for profile in args.profiles]
+    for name, base_url in targets:
+        server = None
+        if base_url is None:
+            server = start_server(name, args.port, args.workers)
+            base_url = f'http://127.0.0.1:{args.port}'
+        try:
+            token = args.token or get_token(base_url, args.email, args.password)
+            run_load(base_url, paths, token, args.concurrency, args.warmup)
+            report(name, run_load(base_url, paths, token, args.concurrency, args.requests))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""
+Scaling benchmark and cross-check of the Fibonacci engines of utils.py.
+
+For n = 10, 100, ..., --max-n the script times the fast doubling engine and, up to --iterative-max-n,
+the reference iterative one. Before the timing the engines are compared on every n below --check-n and
+on the benchmarked n, the results above --iterative-max-n are checked by the Cassini identity
+F(n - 1) * F(n + 1) - F(n) ** 2 = (-1) ** n instead.
+
+Usage:
+    python benchmarks/fibonacci.py
+    python benchmarks/fibonacci.py --max-n 1000000 --iterative-max-n 100000 --repeat 3
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils import fibonacci_doubling, fibonacci_iterative, fibonacci_pair  # noqa: E402
+
+
+def measure(function, n, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(n)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+"""
+    Function for comparing the engines on every n below check_n, raises AssertionError on the first mismatch
+"""
+def cross_check(check_n):
+    a, b = 0, 1
+    for n in range(check_n):
+        assert fibonacci_doubling(n) == a, f'doubling engine differs at n={n}'
+        assert fibonacci_iterative(n) == a, f'iterative engine differs at n={n}'
+        a, b = b, a + b
+
+
+def check_cassini(n):
+    previous, current = fibonacci_pair(n - 1)
+    following = previous + current
+    assert previous * following - current * current == (-1) ** n, f'Cassini identity fails at n={n}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the scaling of the Fibonacci engines')
+    parser.add_argument('--max-n', type=int, default=10 ** 7)
+    parser.add_argument('--iterative-max-n', type=int, default=10 ** 5,
+                        help='largest n timed with the iterative engine, it is quadratic in the digits')
+    parser.add_argument('--check-n', type=int, default=2000, help='engines are compared on every n below it')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    cross_check(args.check_n)
+    print(f'Engines agree on n < {args.check_n}')
+    print(f'{"n":>10} {"digits":>10} {"doubling, s":>12} {"iterative, s":>13} {"speedup":>9}')
+    n = 10
+    while n <= args.max_n:
+        result, doubling_time = measure(fibonacci_doubling, n, args.repeat)
+        # log10(F(n)) = n * log10(phi) - log10(sqrt(5)) for the large n
+        digits = len(str(result)) if n <= 10 ** 4 else int(n * 0.20898764024997873 - 0.3494850021680094) + 1
+        if n <= args.iterative_max_n:
+            reference, iterative_time = measure(fibonacci_iterative, n, 1)
+            assert reference == result, f'engines differ at n={n}'
+            print(f'{n:>10} {digits:>10} {doubling_time:>12.6f} {iterative_time:>13.6f} '
+                  f'{iterative_time / doubling_time:>8.1f}x')
+        else:
+            check_cassini(n)
+            print(f'{n:>10} {digits:>10} {doubling_time:>12.6f} {"-":>13} {"-":>9}')
+        n *= 10
+
+
+if __name__ == '__main__':
+    sys.exit(main())
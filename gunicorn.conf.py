@@ -0,0 +1,21 @@
+import os
+
+# Serving profile, the same variable switches the read-only views to the async ones (see api/async_views.py)
+#   wsgi - sync workers (default)
+#   asgi - uvicorn workers, run locally with: SERVER_PROFILE=asgi gunicorn
+if os.environ.get('SERVER_PROFILE', 'wsgi') == 'asgi':
+    wsgi_app = 'akvelonTestTask.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'akvelonTestTask.wsgi:application'
+
+
+# Gunicorn does not run the Django system checks, the cache checks are run once in the master process,
+# so the warning of the disabled users cache (see api/checks.py) is written to the log at the start
+def on_starting(server):
+    import django
+    from django.core.management import call_command
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'akvelonTestTask.settings')
+    django.setup()
+    call_command('check', tags=['caches'])
@@ -0,0 +1,222 @@
+import os
+import tempfile
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
+from unittest import TestCase, mock
+
+import utils
+
+
+"""
+    Function for getting the first count Fibonacci numbers by the definition, the reference of the tests
+"""
+def naive_fibonacci(count):
+    numbers = [0, 1]
+    while len(numbers) < count:
+        numbers.append(numbers[-1] + numbers[-2])
+    return numbers[:count]
+
+
+REFERENCE = naive_fibonacci(600)
+
+
+class ScriptTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    """
+        Method for running the script with the arguments, returns the printed output
+    """
+    def run_main(self, *args):
+        output = StringIO()
+        with redirect_stdout(output):
+            utils.main(['fibonacci', *map(str, args)])
+        return output.getvalue()
+
+    """
+        Method for checking that the script stops with the argparse error containing the message
+    """
+    def assertScriptError(self, message, *args):
+        errors = StringIO()
+        with redirect_stderr(errors), self.assertRaises(SystemExit) as raised:
+            self.run_main(*args)
+        self.assertEqual(raised.exception.code, 2)
+        self.assertIn(message, errors.getvalue())
+
+
+class EngineTests(ScriptTestCase):
+    def test_engines(self):
+        for n in range(len(REFERENCE) - 1):
+            self.assertEqual(utils.fibonacci(n), REFERENCE[n])
+            self.assertEqual(utils.fibonacci(n, 'iterative'), REFERENCE[n])
+            self.assertEqual(utils.fibonacci_pair(n), (REFERENCE[n], REFERENCE[n + 1]))
+
+    def test_combine_pairs(self):
+        for i, j in [(0, 0), (0, 7), (1, 1), (13, 200), (299, 250)]:
+            first = REFERENCE[i], REFERENCE[i + 1]
+            second = REFERENCE[j], REFERENCE[j + 1]
+            self.assertEqual(utils.combine_pairs(first, second), (REFERENCE[i + j], REFERENCE[i + j + 1]))
+
+    def test_negative_n(self):
+        self.assertEqual(utils.fibonacci(-5), 0)
+        with self.assertRaises(ValueError):
+            utils.fibonacci_pair(-1)
+
+    def test_main(self):
+        self.assertEqual(self.run_main(100), f'{REFERENCE[100]}\n')
+        self.assertEqual(self.run_main(100, '--engine', 'iterative'), f'{REFERENCE[100]}\n')
+
+    def test_out(self):
+        self.run_main(200, '--out', self.path('out.txt'))
+        with open(self.path('out.txt')) as file:
+            self.assertEqual(file.read(), f'{REFERENCE[200]}\n')
+
+    def test_unwritable_out(self):
+        self.assertScriptError('can not open the output file', 13, '--out', self.path('missing/out.txt'))
+
+
+class ModularTests(ScriptTestCase):
+    def test_fibonacci_mod(self):
+        for m in (1, 2, 10, 97, 1000, 2 ** 64 + 13):
+            for n in range(len(REFERENCE)):
+                self.assertEqual(utils.fibonacci_mod(n, m), REFERENCE[n] % m)
+        with self.assertRaises(ValueError):
+            utils.fibonacci_mod(10, 0)
+
+    def test_pisano_table(self):
+        self.assertEqual(len(utils.pisano_table(10)), 60)
+        self.assertEqual(list(utils.pisano_table(10)), [number % 10 for number in REFERENCE[:60]])
+        self.assertEqual(list(utils.pisano_table(1)), [0])
+        # The period may be longer than the limit, the table is not searched
+        self.assertIsNone(utils.pisano_table(10, limit=59))
+
+    def test_fibonacci_batch(self):
+        # The Pisano period modulo 1000 is 1500
+        period = [number % 1000 for number in naive_fibonacci(1500)]
+        numbers = [0, 1, 2, 59, 60, 61, 1499, 1500, 1501, 10 ** 30 + 7, -3]
+        expected = [0 if n < 0 else period[n % 1500] for n in numbers]
+        self.assertEqual(utils.fibonacci_batch(numbers, 1000), expected)
+        with mock.patch('utils.numpy', None):
+            self.assertEqual(utils.fibonacci_batch(numbers, 1000), expected)
+        with mock.patch('utils.pisano_table', return_value=None):
+            self.assertEqual(utils.fibonacci_batch(numbers, 1000), expected)
+        self.assertEqual(utils.fibonacci_batch([5, 300]), [REFERENCE[5], REFERENCE[300]])
+
+    def test_main(self):
+        self.assertEqual(self.run_main(500, '--mod', 1000), f'{REFERENCE[500] % 1000}\n')
+        self.assertScriptError('--mod must be positive', 5, '--mod', 0)
+
+    def test_batch_file(self):
+        with open(self.path('numbers.txt'), 'w') as file:
+            file.write('1 2 3\n\n  100\t500\n')
+        with mock.patch('utils.BATCH_SIZE', 2):
+            output = self.run_main('--mod', 97, '--batch', self.path('numbers.txt'))
+        self.assertEqual(output.split(), [str(REFERENCE[n] % 97) for n in (1, 2, 3, 100, 500)])
+
+    def test_batch_stdin(self):
+        with mock.patch('sys.stdin', StringIO('7\n8\n')):
+            self.assertEqual(self.run_main('--batch'), f'{REFERENCE[7]}\n{REFERENCE[8]}\n')
+
+    def test_bad_batch_token(self):
+        with mock.patch('sys.stdin', StringIO('7 x8\n')):
+            self.assertScriptError("invalid n in the batch input: 'x8'", '--batch')
+
+    def test_missing_batch_file(self):
+        self.assertScriptError('can not read the batch file', '--batch', self.path('missing.txt'))
+
+
+class RangeTests(ScriptTestCase):
+    def test_fibonacci_range(self):
+        for a, b in [(0, 0), (0, 20), (17, 17), (250, 599)]:
+            self.assertEqual(list(utils.fibonacci_range(a, b)), REFERENCE[a:b + 1])
+            self.assertEqual(list(utils.fibonacci_range(a, b, 97)), [number % 97 for number in REFERENCE[a:b + 1]])
+        with self.assertRaises(ValueError):
+            list(utils.fibonacci_range(5, 4))
+
+    def test_main(self):
+        with mock.patch('utils.WRITE_BUFFER_SIZE', 64):
+            output = self.run_main('--range', 90, 120)
+        self.assertEqual(output.split(), [str(number) for number in REFERENCE[90:121]])
+        self.assertEqual(self.run_main('--range', 90, 120, '--mod', 10).split(),
+                         [str(number % 10) for number in REFERENCE[90:121]])
+        self.assertScriptError('requires 0 <= A <= B', '--range', 5, 4)
+
+    def test_checkpoints(self):
+        path = self.path('checkpoints.json')
+        checkpoints = utils.FibonacciCheckpoints(path, 100)
+        self.assertEqual(list(utils.fibonacci_range(150, 420, checkpoints=checkpoints)), REFERENCE[150:421])
+        self.assertEqual(sorted(checkpoints.pairs), [100, 400])
+        checkpoints.save()
+
+        checkpoints = utils.FibonacciCheckpoints(path, 100)
+        self.assertEqual(checkpoints.pairs, {k: (REFERENCE[k], REFERENCE[k + 1]) for k in (100, 400)})
+        self.assertEqual(checkpoints.nearest(399), (100, (REFERENCE[100], REFERENCE[101])))
+        self.assertEqual(list(utils.fibonacci_range(450, 460, checkpoints=checkpoints)), REFERENCE[450:461])
+
+        self.run_main('--range', 500, 510, '--checkpoints', path, '--checkpoint-interval', 100)
+        self.assertEqual(sorted(utils.FibonacciCheckpoints(path, 100).pairs), [100, 400, 500])
+
+    def test_checkpoints_size(self):
+        path = self.path('checkpoints.json')
+        checkpoints = utils.FibonacciCheckpoints(path, 100)
+        for k in (100, 200, 300, 400, 500):
+            checkpoints.add(k, (REFERENCE[k], REFERENCE[k + 1]))
+        checkpoints.save()
+        sizes = {k: utils.pair_size(pair) for k, pair in checkpoints.pairs.items()}
+
+        # The file written with the larger limit is trimmed from the oldest pairs when it is loaded
+        with mock.patch('utils.MAX_CHECKPOINTS_SIZE', sizes[400] + sizes[500]):
+            checkpoints = utils.FibonacciCheckpoints(path, 100)
+            self.assertEqual(sorted(checkpoints.pairs), [400, 500])
+            self.assertEqual(checkpoints.size, sizes[400] + sizes[500])
+            # The pair larger than the whole limit is not stored
+            checkpoints.add(10000, utils.fibonacci_pair(10000))
+            self.assertEqual(sorted(checkpoints.pairs), [400, 500])
+
+    def test_damaged_checkpoints(self):
+        path = self.path('checkpoints.json')
+        for content in ('{"100": ', '[1, 2]', '{"100": ["zz", "1"]}'):
+            with open(path, 'w') as file:
+                file.write(content)
+            errors = StringIO()
+            with redirect_stderr(errors):
+                output = self.run_main('--range', 100, 101, '--checkpoints', path, '--checkpoint-interval', 100)
+            self.assertIn('is damaged and will be rewritten', errors.getvalue())
+            self.assertEqual(output.split(), [str(REFERENCE[100]), str(REFERENCE[101])])
+            self.assertEqual(sorted(utils.FibonacciCheckpoints(path, 100).pairs), [100])
+
+
+class OutputTests(ScriptTestCase):
+    def test_to_decimal_string(self):
+        with mock.patch('utils.DECIMAL_SPLIT_BITS', 64):
+            for number in REFERENCE[::37] + [10 ** 300, 2 ** 1000 - 1, -REFERENCE[599]]:
+                self.assertEqual(utils.to_decimal_string(number), str(number))
+
+    def test_formats(self):
+        self.assertEqual(self.run_main(300, '--format', 'hex'), f'{REFERENCE[300]:x}\n')
+        self.run_main(0, '--format', 'bin', '--out', self.path('zero.bin'))
+        self.run_main(300, '--format', 'bin', '--out', self.path('out.bin'))
+        with open(self.path('zero.bin'), 'rb') as file:
+            self.assertEqual(file.read(), b'\0')
+        with open(self.path('out.bin'), 'rb') as file:
+            self.assertEqual(int.from_bytes(file.read(), 'big'), REFERENCE[300])
+        self.assertScriptError('--format bin can be used only with n', '--range', 1, 2, '--format', 'bin')
+
+    def test_digits(self):
+        reference = naive_fibonacci(5001)
+        # The last 5 digits of F(44) start with the zero
+        for n in (1, 12, 13, 44, 100, 599, 5000):
+            for k in (1, 5, 30):
+                self.assertEqual(utils.fibonacci_leading_digits(n, k), str(reference[n])[:k])
+                self.assertEqual(utils.fibonacci_last_digits(n, k), str(reference[n])[-k:])
+
+    def test_main_digits(self):
+        self.assertEqual(self.run_main(599, '--digits', 10), f'{str(REFERENCE[599])[:10]}\n')
+        self.assertEqual(self.run_main(599, '--last-digits', 10), f'{str(REFERENCE[599])[-10:]}\n')
+        self.assertScriptError('number of digits must be positive', 599, '--digits', 0)
+        self.assertScriptError('can be used only with n', 599, '--digits', 3, '--mod', 10)
@@ -1,7 +1,36 @@
+import argparse
+import decimal
+import json
+import os
 import sys
+from array import array
+from functools import lru_cache
+from itertools import islice
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
-def fibonacci(n: int):
+EXAMPLE = 'Example: python utils.py fibonacci 13'
+# Largest Pisano period kept as the lookup table (8 bytes per entry), larger moduli use the modular fast doubling
+PISANO_TABLE_LIMIT = 4 * 10 ** 6
+# Number of the input lines read and answered at once by the batch mode
+BATCH_SIZE = 65536
+# Range checkpoints are stored at the multiples of the interval, the oldest ones are dropped when the hex digits
+# of the stored pairs exceed the size limit (F(k) has about k / 5.7 hex digits)
+CHECKPOINT_INTERVAL = 10000
+MAX_CHECKPOINTS_SIZE = 64 * 2 ** 20
+# Number of characters collected before the write of the range output, also the size of the written chunks
+WRITE_BUFFER_SIZE = 1 << 20
+# Numbers below this number of bits are converted to decimal by str(), it is below the int to str digits limit
+DECIMAL_SPLIT_BITS = 8192
+# log10 of the golden ratio and of sqrt(5): log10(F(n)) = n * LOG10_PHI - LOG10_SQRT5 for the large n
+LOG10_PHI = 0.20898764024997873
+LOG10_SQRT5 = 0.3494850021680094
+
+
+def fibonacci_iterative(n: int):
     a = 0
     b = 1
     for i in range(n):
@@ -9,19 +38,437 @@ def fibonacci(n: int):
     return a
 
 
-if __name__ == '__main__':
-    args = sys.argv
+"""
+    Function for getting the pair (F(n), F(n + 1)) by the fast doubling:
+    F(2k) = F(k) * (2 * F(k + 1) - F(k)), F(2k + 1) = F(k) ** 2 + F(k + 1) ** 2.
+    The bits of n are taken from the highest one, so only O(log n) big integer multiplications are done.
+    With m all products are reduced modulo m
+"""
+def fibonacci_pair(n: int, m: int = None):
+    if n < 0:
+        raise ValueError('n must be non-negative')
+    a, b = 0, 1
+    for bit in bin(n)[2:]:
+        c = a * (2 * b - a)
+        d = a * a + b * b
+        if m is not None:
+            c, d = c % m, d % m
+        if bit == '1':
+            a, b = d, c + d
+        else:
+            a, b = c, d
+    if m is not None:
+        return a % m, b % m
+    return a, b
 
-    if len(args) != 3:
-        arg = 'help'
-    else:
-        arg = args[2]
 
-    if arg == 'help':
-        print('Example: python utils.py fibonacci 13')
+"""
+    Function for getting (F(i + j), F(i + j + 1)) from the pairs (F(i), F(i + 1)) and (F(j), F(j + 1)):
+    F(i + j) = F(i) * F(j + 1) + F(i - 1) * F(j), F(i + j + 1) = F(i + 1) * F(j + 1) + F(i) * F(j)
+"""
+def combine_pairs(first, second):
+    a, b = first
+    c, d = second
+    return a * d + b * c - a * c, b * d + a * c
+
+
+def fibonacci_doubling(n: int):
+    if n <= 0:
+        return 0
+    return fibonacci_pair(n)[0]
+
+
+# The iterative engine is the reference implementation for checking the fast one
+ENGINES = {
+    'doubling': fibonacci_doubling,
+    'iterative': fibonacci_iterative,
+}
+
+
+def fibonacci(n: int, engine: str = 'doubling'):
+    return ENGINES[engine](n)
+
+
+"""
+    Function for getting F(n) mod m by the fast doubling with all products reduced modulo m
+"""
+def fibonacci_mod(n: int, m: int):
+    if m < 1:
+        raise ValueError('m must be positive')
+    if n <= 0:
+        return 0
+    return fibonacci_pair(n, m)[0]
+
+
+"""
+    Function for getting the table of F(k) mod m for k in one Pisano period (the period of the sequence
+    modulo m, it is at most 6 * m), or None when the period may be longer than the limit. The last tables
+    are cached, each one takes up to 8 * limit bytes
+"""
+@lru_cache(maxsize=2)
+def pisano_table(m: int, limit: int = PISANO_TABLE_LIMIT):
+    if m < 1:
+        raise ValueError('m must be positive')
+    if m == 1:
+        return array('q', [0])
+    if 6 * m > limit or m >= 2 ** 63:
+        return None
+    table = array('q', [0])
+    a, b = 0, 1
+    while len(table) <= limit:
+        a, b = b, (a + b) % m
+        if a == 0 and b == 1:
+            return table
+        table.append(a)
+    return None
+
+
+"""
+    Function for answering many n at once: F(n) mod m is taken from the Pisano table when it fits
+    in the memory (with NumPy the lookup is vectorised), otherwise it is computed by the modular fast doubling.
+    Without m the full numbers are computed. Negative n give 0 like fibonacci()
+"""
+def fibonacci_batch(numbers, m=None):
+    if m is None:
+        return [fibonacci(n) for n in numbers]
+    table = pisano_table(m)
+    if table is None:
+        return [fibonacci_mod(n, m) for n in numbers]
+    period = len(table)
+    if numpy is not None:
+        lookup = numpy.frombuffer(table, dtype=numpy.int64)
+        try:
+            values = numpy.asarray(numbers, dtype=numpy.int64)
+        except OverflowError:
+            values = numpy.asarray([n % period if n > 0 else 0 for n in numbers], dtype=numpy.int64)
+        return numpy.where(values > 0, lookup[values % period], 0).tolist()
+    return [table[n % period] if n > 0 else 0 for n in numbers]
+
+
+class BatchInputError(ValueError):
+    pass
+
+
+def parse_batch_number(token):
+    try:
+        return int(token)
+    except ValueError:
+        raise BatchInputError(f'invalid n in the batch input: {token!r}') from None
+
+
+"""
+    Function for answering the whitespace separated n read from the file by chunks, the answers are written
+    one per line as soon as the chunk is done. Raises BatchInputError on the token which is not an integer
+"""
+def stream_batch(source, output, m=None, formatter=str):
+    tokens = (token for line in source for token in line.split())
+    while True:
+        numbers = [parse_batch_number(token) for token in islice(tokens, BATCH_SIZE)]
+        if not numbers:
+            break
+        output.write('\n'.join(map(formatter, fibonacci_batch(numbers, m))) + '\n')
+
+
+"""
+    Cache file of the (F(k), F(k + 1)) pairs at the multiples of the interval. The pair of the large n is
+    computed from the nearest stored pair below n and the pair of the difference, so repeated range queries
+    over the large indices do not start from zero. The numbers are stored in hex in the JSON file, the file
+    size is bounded by MAX_CHECKPOINTS_SIZE
+"""
+class FibonacciCheckpoints:
+    def __init__(self, path, interval=CHECKPOINT_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.pairs = {}
+        self.size = 0
+        self.changed = False
+        try:
+            with open(path) as file:
+                data = json.load(file)
+            pairs = {int(k): (int(pair[0], 16), int(pair[1], 16)) for k, pair in data.items()}
+        except FileNotFoundError:
+            return
+        except (ValueError, TypeError, IndexError, AttributeError):
+            print(f'Checkpoints file {path} is damaged and will be rewritten', file=sys.stderr)
+            return
+        for k, pair in pairs.items():
+            self.add(k, pair)
+        self.changed = False
+
+    def nearest(self, n):
+        k = max((k for k in self.pairs if k <= n), default=None)
+        if k is None:
+            return 0, (0, 1)
+        return k, self.pairs[k]
+
+    def pair(self, n):
+        if n in self.pairs:
+            return self.pairs[n]
+        k, pair = self.nearest(n)
+        pair = combine_pairs(pair, fibonacci_pair(n - k))
+        self.add(n, pair)
+        return pair
+
+    def add(self, k, pair):
+        size = pair_size(pair)
+        if k <= 0 or k in self.pairs or size > MAX_CHECKPOINTS_SIZE:
+            return
+        self.pairs[k] = pair
+        self.size += size
+        while self.size > MAX_CHECKPOINTS_SIZE:
+            self.size -= pair_size(self.pairs.pop(next(iter(self.pairs))))
+        self.changed = True
+
+    def save(self):
+        if not self.changed:
+            return
+        data = {str(k): [format(a, 'x'), format(b, 'x')] for k, (a, b) in self.pairs.items()}
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(data, file)
+        os.replace(temporary, self.path)
+        self.changed = False
+
+
+def pair_size(pair):
+    return sum((number.bit_length() + 3) // 4 for number in pair)
+
+
+"""
+    Generator of F(a), ..., F(b): the start pair is got by the fast doubling (from the nearest checkpoint if
+    the checkpoints are given), then the numbers are produced by the additions. The last passed multiple
+    of the checkpoints interval is stored when the range is done
+"""
+def fibonacci_range(a: int, b: int, m: int = None, checkpoints: FibonacciCheckpoints = None):
+    if a < 0 or b < a:
+        raise ValueError('range must be 0 <= a <= b')
+    if checkpoints is not None and m is None:
+        base = a - a % checkpoints.interval
+        current, following = combine_pairs(checkpoints.pair(base), fibonacci_pair(a - base))
     else:
+        current, following = fibonacci_pair(a, m)
+    passed = None
+    for k in range(a, b + 1):
+        yield current
+        current, following = following, current + following
+        if m is not None:
+            following %= m
+        if checkpoints is not None and (k + 1) % checkpoints.interval == 0:
+            passed = k + 1, (current, following)
+    if passed is not None and m is None:
+        checkpoints.add(*passed)
+
+
+"""
+    Function for writing the values one per line, the lines are collected and written by the large blocks
+"""
+def write_lines(values, output, formatter=str, buffer_size=WRITE_BUFFER_SIZE):
+    lines = []
+    size = 0
+    for value in values:
+        line = formatter(value)
+        lines.append(line)
+        size += len(line) + 1
+        if size >= buffer_size:
+            output.write('\n'.join(lines) + '\n')
+            lines = []
+            size = 0
+    if lines:
+        output.write('\n'.join(lines) + '\n')
+
+
+"""
+    Function for converting the large non-negative number to the decimal string by the divide and conquer:
+    the number is split into the high and low halves of the bits, and the halves are joined back
+    as Decimal(high) * 2 ** k + Decimal(low). The decimal module multiplies the long numbers in sub-quadratic time,
+    and str() of Decimal is linear, while str() of int is quadratic before Python 3.12
+"""
+def to_decimal_string(n: int):
+    if n < 0:
+        return '-' + to_decimal_string(-n)
+    if n.bit_length() <= DECIMAL_SPLIT_BITS:
+        return str(n)
+    powers = {}
+
+    def power_of_two(bits):
+        if bits not in powers:
+            half = bits >> 1
+            powers[bits] = power_of_two(half) * power_of_two(bits - half) if half else decimal.Decimal(2) ** bits
+        return powers[bits]
+
+    def convert(number, bits):
+        if bits <= DECIMAL_SPLIT_BITS:
+            return decimal.Decimal(str(number))
+        half = bits >> 1
+        high = number >> half
+        low = number - (high << half)
+        return convert(high, bits - half) * power_of_two(half) + convert(low, half)
+
+    with decimal.localcontext() as context:
+        context.prec = decimal.MAX_PREC
+        context.Emax = decimal.MAX_EMAX
+        context.Emin = decimal.MIN_EMIN
+        context.traps[decimal.Inexact] = True
+        return str(convert(n, n.bit_length()))
+
+
+def to_bytes(n: int):
+    return n.to_bytes(max(1, (n.bit_length() + 7) // 8), 'big')
+
+
+FORMATS = {
+    'dec': to_decimal_string,
+    'hex': lambda n: format(n, 'x'),
+    'bin': to_bytes,
+}
+
+
+"""
+    Function for getting the first k decimal digits of F(n) without computing F(n): the fractional part
+    of log10(F(n)) = n * log10(phi) - log10(sqrt(5)) is calculated with enough decimal precision
+    for the digits of n and k. Small F(n) are computed exactly
+"""
+def fibonacci_leading_digits(n: int, k: int):
+    if k < 1:
+        raise ValueError('k must be positive')
+    if n * LOG10_PHI <= k + 20:
+        return to_decimal_string(fibonacci(n))[:k]
+    with decimal.localcontext() as context:
+        context.prec = k + len(str(n)) + 20
+        sqrt5 = decimal.Decimal(5).sqrt()
+        logarithm = n * ((1 + sqrt5) / 2).log10() - sqrt5.log10()
+        fraction = logarithm - int(logarithm)
+        return str(int(decimal.Decimal(10) ** (fraction + k - 1)))[:k]
+
+
+"""
+    Function for getting the last k decimal digits of F(n) by the modular fast doubling, the digits are
+    zero padded when F(n) has more than k digits
+"""
+def fibonacci_last_digits(n: int, k: int):
+    if k < 1:
+        raise ValueError('k must be positive')
+    if n * LOG10_PHI <= k + 1:
+        return str(fibonacci(n))[-k:]
+    return str(fibonacci_mod(n, 10 ** k)).zfill(k)
+
+
+"""
+    Function for writing the string or bytes by the chunks
+"""
+def write_chunked(output, data, chunk_size=WRITE_BUFFER_SIZE):
+    for start in range(0, len(data), chunk_size):
+        output.write(data[start:start + chunk_size])
+
+
+"""
+    Function for removing the limit of the int to str conversion (Python 3.11+). The long numbers are
+    converted by to_decimal_string(), which calls str() only for the parts below the limit, so the limit
+    is removed just in case of the other conversions
+"""
+def allow_long_output():
+    if hasattr(sys, 'set_int_max_str_digits'):
+        sys.set_int_max_str_digits(0)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python utils.py')
+    commands = parser.add_subparsers(dest='command')
+    command = commands.add_parser('fibonacci', help='print the n-th Fibonacci number', epilog=EXAMPLE)
+    command.add_argument('n', type=int, nargs='?')
+    command.add_argument('--engine', choices=ENGINES, default='doubling',
+                         help='doubling: O(log n) fast doubling (default), iterative: reference loop')
+    command.add_argument('--mod', type=int, metavar='M', help='print F(n) mod M')
+    command.add_argument('--batch', nargs='?', const='-', metavar='FILE',
+                         help='read many n from FILE (stdin by default) and print the answers line by line')
+    command.add_argument('--range', type=int, nargs=2, metavar=('A', 'B'), help='print F(A), ..., F(B)')
+    command.add_argument('--checkpoints', metavar='FILE', help='checkpoints cache file of the --range queries')
+    command.add_argument('--checkpoint-interval', type=int, default=CHECKPOINT_INTERVAL,
+                         help=f'distance between the stored checkpoints (default {CHECKPOINT_INTERVAL})')
+    command.add_argument('--format', choices=FORMATS, default='dec',
+                         help='dec: decimal (default), hex: hexadecimal, bin: raw big-endian bytes of F(n)')
+    command.add_argument('--out', metavar='FILE', help='write the output to FILE instead of stdout')
+    command.add_argument('--digits', type=int, metavar='K', help='print only the first K digits of F(n)')
+    command.add_argument('--last-digits', type=int, metavar='K', help='print only the last K digits of F(n)')
+    return parser, command
+
+
+def main(args):
+    parser, command = build_parser()
+    if len(args) < 2 or args[0] != 'fibonacci' or 'help' in args[1:]:
+        print(EXAMPLE)
+        if args[:1] == ['fibonacci']:
+            command.print_help()
+        return
+    options = parser.parse_args(args)
+    if [options.n, options.batch, options.range].count(None) != 2:
+        command.error('exactly one of n, --batch and --range is required')
+    if options.mod is not None and options.mod < 1:
+        command.error('--mod must be positive')
+    if options.range is not None and not 0 <= options.range[0] <= options.range[1]:
+        command.error('--range A B requires 0 <= A <= B')
+    if options.checkpoint_interval < 1:
+        command.error('--checkpoint-interval must be positive')
+    digits = options.digits is not None or options.last_digits is not None
+    if digits and (options.n is None or options.mod is not None or options.format != 'dec'
+                   or options.digits is not None and options.last_digits is not None):
+        command.error('--digits or --last-digits can be used only with n and without --mod and --format')
+    if any(value is not None and value < 1 for value in (options.digits, options.last_digits)):
+        command.error('number of digits must be positive')
+    if options.format == 'bin' and options.n is None:
+        command.error('--format bin can be used only with n')
+    allow_long_output()
+
+    binary = options.format == 'bin'
+    if options.out is not None:
         try:
-            arg = int(arg)
-            print(fibonacci(arg))
-        except ValueError:
-            print('Example: python utils.py fibonacci 13')
\ No newline at end of file
+            output = open(options.out, 'wb' if binary else 'w')
+        except OSError as error:
+            command.error(f'can not open the output file: {error}')
+    else:
+        output = sys.stdout.buffer if binary else sys.stdout
+    try:
+        run(options, output)
+    except BatchInputError as error:
+        command.error(str(error))
+    finally:
+        if options.out is not None:
+            output.close()
+
+
+def run(options, output):
+    formatter = FORMATS[options.format]
+    if options.range is not None:
+        checkpoints = None
+        if options.checkpoints is not None:
+            checkpoints = FibonacciCheckpoints(options.checkpoints, options.checkpoint_interval)
+        write_lines(fibonacci_range(*options.range, options.mod, checkpoints), output, formatter)
+        if checkpoints is not None:
+            checkpoints.save()
+    elif options.batch is not None:
+        if options.batch == '-':
+            stream_batch(sys.stdin, output, options.mod, formatter)
+        else:
+            try:
+                source = open(options.batch)
+            except OSError as error:
+                raise BatchInputError(f'can not read the batch file: {error}') from None
+            with source:
+                stream_batch(source, output, options.mod, formatter)
+    elif options.digits is not None:
+        output.write(fibonacci_leading_digits(options.n, options.digits) + '\n')
+    elif options.last_digits is not None:
+        output.write(fibonacci_last_digits(options.n, options.last_digits) + '\n')
+    elif options.format == 'bin':
+        write_chunked(output, to_bytes(fibonacci(options.n, options.engine)))
+    else:
+        if options.mod is not None:
+            value = fibonacci_mod(options.n, options.mod)
+        else:
+            value = fibonacci(options.n, options.engine)
+        write_chunked(output, formatter(value))
+        output.write('\n')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])